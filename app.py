@@ -2,94 +2,21 @@ from flask import Flask, render_template, request, redirect, url_for, jsonify
 from flask_cors import CORS
 from flask_login import login_required, current_user, LoginManager
 from dotenv import load_dotenv
-import nltk
 import os
 import json
-import random
-import pickle
-import numpy as np
-from keras.models import load_model
-from nltk.stem import WordNetLemmatizer
-from routes.chat_routes import chat_bp
+from routes.chat_routes import chat_bp, fetch_chat_page
 from routes.pengaduan_routes import pengaduan_bp
 from routes.antrian_routes import antrian_bp
 from routes.data_routes import data_bp
-from auth import auth, load_user, bcrypt
-from config import get_db_connection
+from auth import auth, load_user, bcrypt, admin_required, user_cache
+from config import pool_stats
+from chat_logger import chat_log
+import email_service
+from queue_events import broker as antrian_broker
+import chatbot_engine
+from chatbot_engine import engine
 
-# Pastikan hanya perlu mengunduh saat pertama kali setup
-nltk.download('punkt')
-nltk.download('wordnet')
-
-# Inisialisasi lemmatizer
-lemmatizer = WordNetLemmatizer()
-
-# Nonaktifkan OneDNN jika menyebabkan error
-os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
-
-# Load model dan data
 load_dotenv()
-model = load_model('model.keras')
-intents = json.loads(open('data.json').read())
-words = pickle.load(open('texts.pkl', 'rb'))
-classes = pickle.load(open('labels.pkl', 'rb'))
-
-# Fungsi membersihkan input pengguna
-def clean_up_sentence(sentence):
-    sentence_words = nltk.word_tokenize(sentence)
-    sentence_words = [lemmatizer.lemmatize(word.lower()) for word in sentence_words if word.isalpha()]
-    return sentence_words
-
-# Mengubah input menjadi bag-of-words
-def bow(sentence, words):
-    sentence_words = clean_up_sentence(sentence)
-    bag = [1 if w in sentence_words else 0 for w in words]
-    return np.array(bag)
-
-# Prediksi kelas intent dari input pengguna
-def predict_class(sentence):
-    p = bow(sentence, words)
-    if np.all(p == 0):  # Jika tidak ada kata yang dikenali
-        return []
-    
-    res = model.predict(np.array([p]))[0]
-    ERROR_THRESHOLD = 0.25
-    results = [[i, r] for i, r in enumerate(res) if r > ERROR_THRESHOLD]
-    results.sort(key=lambda x: x[1], reverse=True)
-    return [{"intent": classes[r[0]], "probability": str(r[1])} for r in results]
-
-# Mendapatkan respons berdasarkan intent
-def getResponse(ints):
-    if not ints:
-        return get_noanswer_response(intents)
-
-    tag = ints[0]['intent']
-    for intent in intents['intents']:
-        if intent['tag'] == tag:
-            return {
-                "response": random.choice(intent['responses']),
-                "intent": tag
-            }
-
-    return get_noanswer_response(intents)
-
-def get_noanswer_response(intents):
-    for intent in intents['intents']:
-        if intent['tag'] == 'noanswer':
-            return {
-                "response": random.choice(intent['responses']),
-                "intent": 'noanswer'
-            }
-    # Fallback jika tag noanswer tidak ditemukan
-    return {
-        "response": "Maaf, saya tidak memahami pertanyaan Anda.",
-        "intent": "none"
-    }
-
-# Fungsi utama chatbot
-def chatbot_response(msg):
-    ints = predict_class(msg)
-    return getResponse(ints)
 
 # Flask App
 app = Flask(__name__, static_url_path='/static')
@@ -109,18 +36,9 @@ bcrypt.init_app(app)
 def home():
     if current_user.role == 'user':
         try:
-            with get_db_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT message, response, timestamp 
-                        FROM chat_history 
-                        WHERE user_id = %s 
-                        ORDER BY timestamp ASC
-                    """, (str(current_user.id),))
-                    chats = cur.fetchall()
-
-            history = [{'message': c[0], 'response': c[1], 'timestamp': c[2]} for c in chats]
-            return render_template('index.html', history=history)
+            # Hanya percakapan terbaru; halaman lama dimuat lewat /chat/history saat scroll
+            history, next_cursor = fetch_chat_page(current_user.id)
+            return render_template('index.html', history=history, next_cursor=next_cursor)
 
         except Exception as e:
             return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
@@ -135,14 +53,119 @@ def get_bot_response():
     if not userText:
         return jsonify({"response": "Silakan ketik sesuatu untuk saya jawab.", "intent": "none"})
     
-    result = chatbot_response(userText)
+    result = engine.chatbot_response(userText)
+
+    # Riwayat disimpan server-side lewat buffer write-behind, tanpa menunggu database
+    if current_user.is_authenticated:
+        chat_log.log(current_user.id, userText, result['response'], result['intent'], result['confidence'])
     return jsonify(result)
 
+# Batas permintaan /get/batch
+BATCH_MAX_MESSAGES = int(os.getenv('CHAT_BATCH_MAX_MESSAGES', 500))
+BATCH_MAX_MESSAGE_LENGTH = int(os.getenv('CHAT_BATCH_MAX_MESSAGE_LENGTH', 1000))
+BATCH_MAX_BYTES = int(os.getenv('CHAT_BATCH_MAX_BYTES', 1024 * 1024))
+
+# Klasifikasi banyak pesan sekaligus: {"messages": ["...", ...], "log": true} -> hasil per pesan
+# + waktu proses. "log": false tidak menyimpan ke riwayat chat (mis. uji regresi FAQ).
+@app.route("/get/batch", methods=['POST'])
+def get_bot_batch_response():
+    if request.content_length is not None and request.content_length > BATCH_MAX_BYTES:
+        return jsonify({'error': f'Ukuran permintaan melebihi {BATCH_MAX_BYTES} byte'}), 413
+    # Body chunked tidak punya Content-Length: baca paling banyak satu byte melebihi batas
+    body = request.stream.read(BATCH_MAX_BYTES + 1)
+    if len(body) > BATCH_MAX_BYTES:
+        return jsonify({'error': f'Ukuran permintaan melebihi {BATCH_MAX_BYTES} byte'}), 413
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    messages = data.get('messages') if isinstance(data, dict) else None
+    if not isinstance(messages, list) or not messages:
+        return jsonify({'error': 'Field messages harus berupa daftar pesan yang tidak kosong'}), 400
+    log = data.get('log', True)
+    if not isinstance(log, bool):
+        return jsonify({'error': 'Field log harus berupa true atau false'}), 400
+    if len(messages) > BATCH_MAX_MESSAGES:
+        return jsonify({'error': f'Maksimal {BATCH_MAX_MESSAGES} pesan per permintaan'}), 413
+    for i, msg in enumerate(messages):
+        if not isinstance(msg, str):
+            return jsonify({'error': f'Pesan ke-{i} harus berupa teks'}), 400
+        if len(msg) > BATCH_MAX_MESSAGE_LENGTH:
+            return jsonify({'error': f'Pesan ke-{i} melebihi {BATCH_MAX_MESSAGE_LENGTH} karakter'}), 413
+
+    try:
+        messages = [msg.strip() for msg in messages]
+        results, timing, version = engine.chatbot_batch(messages)
+        for msg, result in zip(messages, results):
+            if not msg:
+                result.update({"response": "Silakan ketik sesuatu untuk saya jawab.", "intent": "none",
+                               "confidence": None})
+            elif log and current_user.is_authenticated:
+                chat_log.log(current_user.id, msg, result['response'], result['intent'], result['confidence'])
+
+        return jsonify({'results': results, 'count': len(results), 'version': version,
+                        'timing': timing})
+
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+# Statistik micro-batching, cache intent dan buffer log chat untuk tuning
+@app.route("/get/stats")
+@login_required
+@admin_required
+def get_batching_stats():
+    return jsonify({'batching': engine.batcher.stats(), 'cache': engine.intent_cache.stats(),
+                    'chat_log': chat_log.stats()})
+
+# Statistik pool koneksi database
+@app.route("/stats/db")
+@login_required
+@admin_required
+def db_pool_stats():
+    return jsonify(pool_stats())
+
+# Statistik outbox email
+@app.route("/stats/email")
+@login_required
+@admin_required
+def email_outbox_stats():
+    try:
+        return jsonify(email_service.outbox_stats())
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+# Statistik fan-out stream antrian
+@app.route("/stats/antrian")
+@login_required
+@admin_required
+def antrian_stream_stats():
+    return jsonify(antrian_broker.stats())
+
+# Statistik cache user Flask-Login
+@app.route("/stats/users")
+@login_required
+@admin_required
+def user_cache_stats():
+    return jsonify(user_cache.stats())
+
+# Readiness probe: 200 jika model sudah dimuat dan di-warm-up, 503 jika belum
+@app.route("/ready")
+def ready():
+    status = engine.status()
+    return jsonify(status), (200 if status['ready'] else 503)
+
 app.register_blueprint(chat_bp, url_prefix='/chat')
 app.register_blueprint(pengaduan_bp, url_prefix='/pengaduan')
 app.register_blueprint(antrian_bp, url_prefix='/antrian')
 app.register_blueprint(auth, url_prefix='/auth')
 app.register_blueprint(data_bp, url_prefix='/data')
 
+# Muat model sesuai CHATBOT_STARTUP (background/eager/lazy)
+chatbot_engine.start()
+
+# Kirim email yang masih tertunda di outbox (EMAIL_WORKER=embedded)
+email_service.start_embedded_workers()
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
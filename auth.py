@@ -4,7 +4,9 @@ from flask_login import UserMixin, login_user, login_required, logout_user, curr
 from config import get_db_connection
 from token_module import generate_reset_token, verify_reset_token
 from email_service import send_email
+from cache import TTLCache
 import psycopg2
+import os
 
 auth = Blueprint('auth', __name__)
 bcrypt = Bcrypt()
@@ -25,19 +27,45 @@ def admin_required(func):
     wrapper.__name__ = func.__name__  # Agar Flask bisa mengenali nama fungsi asli
     return wrapper
 
+# Cache user per proses; TTL pendek membatasi data basi antar worker
+user_cache = TTLCache(
+    maxsize=int(os.getenv('USER_CACHE_SIZE', 4096)),
+    ttl=float(os.getenv('USER_CACHE_TTL', 60))
+)
+
 # Fungsi user_loader untuk Flask-Login
 def load_user(user_id):
+    key = str(user_id)
+    cached = user_cache.get(key)
+    if cached is not None:
+        return cached
+
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT id, email, role FROM users WHERE id = %s", (user_id,))
                 user = cursor.fetchone()
                 if user:
-                    return User(user[0], user[1], user[2])
+                    user_obj = User(user[0], user[1], user[2])
+                    user_cache.set(key, user_obj)
+                    return user_obj
     except Exception as e:
         print(f"Error loading user: {e}")
     return None
 
+# Hapus user dari cache setelah data login/role-nya berubah
+def invalidate_user(user_id):
+    user_cache.invalidate(str(user_id))
+
+def update_user_role(user_id, role):
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE users SET role = %s WHERE id = %s RETURNING id", (role, user_id))
+            updated = cursor.fetchone()
+            conn.commit()
+    invalidate_user(user_id)
+    return updated is not None
+
 @auth.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
@@ -128,10 +156,30 @@ def reset_password(token):
         hashed_password = bcrypt.generate_password_hash(new_password).decode('utf-8')
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("UPDATE users SET password = %s WHERE email = %s", (hashed_password, email))
+                cur.execute("UPDATE users SET password = %s WHERE email = %s RETURNING id", (hashed_password, email))
+                updated = cur.fetchall()
                 conn.commit()
 
+        for (user_id,) in updated:
+            invalidate_user(user_id)
+
         flash('Password berhasil direset', 'success')
         return redirect(url_for('home'))
     
     return render_template('reset_password.html', token=token)
+
+@auth.route('/users/<int:user_id>/role', methods=['POST'])
+@login_required
+@admin_required
+def change_role(user_id):
+    role = request.form.get('role')
+
+    if role not in ('user', 'admin'):
+        return jsonify({'error': 'Role tidak valid'}), 400
+
+    try:
+        if not update_user_role(user_id, role):
+            return jsonify({'error': 'User tidak ditemukan'}), 404
+        return jsonify({'message': 'Role user berhasil diubah'}), 200
+    except psycopg2.Error as e:
+        return jsonify({'error': f'Terjadi kesalahan: {e.pgerror}'}), 500
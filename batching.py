@@ -0,0 +1,108 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+
+class MicroBatcher:
+    """Menggabungkan permintaan prediksi yang datang bersamaan menjadi satu matriks."""
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait=0.002):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self._requests = 0
+            self._batches = 0
+            self._max_batch = 0
+            self._batch_sizes = {}
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+
+    # Worker dibuat saat pertama dipakai (dan dibuat ulang setelah fork worker gunicorn)
+    def _ensure_worker(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    # `predict_fn` bisa diganti per permintaan (mis. model versi baru setelah hot-swap)
+    def submit(self, vector, predict_fn=None):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((vector, predict_fn or self.predict_fn, future, time.perf_counter()))
+        return future
+
+    def predict(self, vector, predict_fn=None, timeout=None):
+        return self.submit(vector, predict_fn).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+
+            # Satu forward pass per model; biasanya hanya ada satu model dalam batch
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+
+            for predict_fn, items in groups.items():
+                try:
+                    output = predict_fn(np.stack([vector for vector, _, _, _ in items]))
+                    for i, (_, _, future, _) in enumerate(items):
+                        future.set_result(output[i])
+                except Exception as e:
+                    for _, _, future, _ in items:
+                        if not future.done():
+                            future.set_exception(e)
+
+            waits = [started - enqueued for _, _, _, enqueued in batch]
+            with self._lock:
+                size = len(batch)
+                self._requests += size
+                self._batches += 1
+                self._max_batch = max(self._max_batch, size)
+                self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+                self._wait_total += sum(waits)
+                self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'requests': self._requests,
+                'batches': self._batches,
+                'avg_batch_size': self._requests / self._batches if self._batches else 0.0,
+                'largest_batch': self._max_batch,
+                'batch_size_counts': dict(sorted(self._batch_sizes.items())),
+                'avg_queue_wait_ms': self._wait_total / self._requests * 1000 if self._requests else 0.0,
+                'max_queue_wait_ms': self._wait_max * 1000,
+            }
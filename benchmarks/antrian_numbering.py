@@ -0,0 +1,127 @@
+# Benchmark penomoran antrian KTP: MAX()+1 lama vs counter per hari.
+# Dijalankan pada schema sementara sehingga tabel produksi tidak tersentuh:
+#   python benchmarks/antrian_numbering.py [jumlah_thread] [pendaftaran_per_thread]
+import os
+import sys
+import time
+import threading
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATABASE_CONFIG
+from routes.antrian_routes import allocate_ticket, queue_position
+
+SCHEMA = 'bench_antrian'
+
+def connect():
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    with conn.cursor() as cur:
+        cur.execute(f"SET search_path TO {SCHEMA}")
+    conn.commit()
+    return conn
+
+def setup():
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(f"CREATE TABLE {SCHEMA}.antrian_ktp (LIKE public.antrian_ktp INCLUDING ALL)")
+        cur.execute(f"CREATE TABLE {SCHEMA}.antrian_counter (LIKE public.antrian_counter INCLUDING ALL)")
+    conn.commit()
+    conn.close()
+
+def teardown():
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+def reset():
+    conn = connect()
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE antrian_ktp, antrian_counter RESTART IDENTITY")
+    conn.commit()
+    conn.close()
+
+# Cara lama: nomor dibaca di koneksi terpisah sebelum insert
+def register_legacy(conn, i):
+    with conn.cursor() as cur:
+        cur.execute("SELECT COALESCE(MAX(nomor_antrian), 0) + 1 FROM antrian_ktp")
+        nomor = cur.fetchone()[0]
+    conn.commit()
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO antrian_ktp (user_id, nama, email, nomor_antrian) VALUES (%s, %s, %s, %s)",
+                    (str(i), f'warga{i}', f'warga{i}@example.com', nomor))
+    conn.commit()
+
+def register_counter(conn, i):
+    with conn.cursor() as cur:
+        tanggal, nomor = allocate_ticket(cur)
+        cur.execute("INSERT INTO antrian_ktp (user_id, nama, email, nomor_antrian, tanggal) VALUES (%s, %s, %s, %s, %s)",
+                    (str(i), f'warga{i}', f'warga{i}@example.com', nomor, tanggal))
+    conn.commit()
+    with conn.cursor() as cur:
+        queue_position(cur, tanggal, nomor)
+    conn.commit()
+
+def run_registrations(register, threads, per_thread):
+    reset()
+    conns = [connect() for _ in range(threads)]
+    barrier = threading.Barrier(threads)
+
+    def worker(t):
+        barrier.wait()
+        for n in range(per_thread):
+            register(conns[t], t * per_thread + n)
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    with conns[0].cursor() as cur:
+        cur.execute("SELECT COUNT(*), COUNT(DISTINCT nomor_antrian) FROM antrian_ktp")
+        total, distinct = cur.fetchone()
+    for conn in conns:
+        conn.close()
+    return total / elapsed, total - distinct
+
+# Jumlah baris yang ditulis saat melayani satu warga di depan antrian
+def serve_cost(legacy):
+    conn = connect()
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, nomor_antrian FROM antrian_ktp WHERE status = 'Menunggu' ORDER BY nomor_antrian LIMIT 1")
+        id, nomor = cur.fetchone()
+        started = time.perf_counter()
+        if legacy:
+            cur.execute("UPDATE antrian_ktp SET status = 'Selesai', nomor_antrian = 0 WHERE id = %s", (id,))
+            rows = cur.rowcount
+            cur.execute("UPDATE antrian_ktp SET nomor_antrian = nomor_antrian - 1 WHERE nomor_antrian > %s", (nomor,))
+            rows += cur.rowcount
+        else:
+            cur.execute("UPDATE antrian_ktp SET status = 'Selesai' WHERE id = %s", (id,))
+            rows = cur.rowcount
+        elapsed = (time.perf_counter() - started) * 1000
+    conn.rollback()
+    conn.close()
+    return rows, elapsed
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    setup()
+    try:
+        for name, register, legacy in [('MAX()+1', register_legacy, True), ('counter', register_counter, False)]:
+            throughput, duplicates = run_registrations(register, threads, per_thread)
+            rows, ms = serve_cost(legacy)
+            print(f"[i] {name:8} {throughput:8.0f} pendaftaran/detik, {duplicates} nomor ganda, "
+                  f"melayani 1 warga menulis {rows} baris ({ms:.2f} ms)")
+    finally:
+        teardown()
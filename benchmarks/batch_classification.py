@@ -0,0 +1,41 @@
+# Benchmark klasifikasi massal: N pesan lewat chatbot_response satu per satu (jalur /get) vs
+# satu panggilan chatbot_batch (jalur /get/batch). Cache intent dikosongkan sebelum tiap putaran.
+#   python benchmarks/batch_classification.py [jumlah_pesan ...]
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('CHATBOT_STARTUP', 'lazy')
+
+from chatbot_engine import engine
+
+def load_messages(count, rng):
+    with open('data.json', encoding='utf-8') as f:
+        patterns = [p for intent in json.load(f)['intents'] for p in intent['patterns']]
+    # Variasi kecil agar tidak semua pesan punya bag-of-words yang sama dengan pola training
+    suffixes = ['', ' ya', ' kak', ' dong', ' min', ' tolong']
+    return [rng.choice(patterns) + rng.choice(suffixes) for _ in range(count)]
+
+def timed(func):
+    engine.intent_cache.invalidate()
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 100, 500]
+    rng = random.Random(5)
+    engine.ensure_loaded()
+
+    for count in sizes:
+        messages = load_messages(count, rng)
+        single_ms = timed(lambda: [engine.chatbot_response(m) for m in messages])
+        timing = {}
+        batch_ms = timed(lambda: timing.update(engine.chatbot_batch(messages)[1]))
+        print(f"[i] {count:4} pesan: satu per satu {single_ms:8.1f} ms, batch {batch_ms:7.1f} ms "
+              f"({single_ms / batch_ms:4.1f}x; preprocess {timing['preprocess_ms']} ms, "
+              f"predict {timing['predict_ms']} ms untuk {timing['predicted_rows']} baris unik)")
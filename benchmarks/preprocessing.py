@@ -0,0 +1,89 @@
+# Benchmark preprocessing teks: jalur NLTK lama vs pipeline bersama di preprocessing.py.
+#   python benchmarks/preprocessing.py [jumlah_kalimat]
+# Tanpa resource punkt, word_tokenize diganti NLTKWordTokenizer (tokenizer yang sama, tanpa
+# pemisahan kalimat); tanpa wordnet, lemmatizer dilewati. Keduanya dicetak di hasil.
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import Preprocessor, DEFAULT_CONFIG
+
+# Contoh pertanyaan warga (bahasa tidak baku, partikel, singkatan)
+QUERIES = [
+    'gmn cara bikin ktp?', 'syarat sktmnya apa aja ya', 'apakah bisa daftar antrian ktp online',
+    'jam buka kantornya kapan', 'sy mau ngajuin pengaduan dong', 'kartu keluarganya hilang gimana',
+    'makasih infonya', 'brp lama pembuatan e-ktp', 'Bagaimanakah mengurus surat pindah domisili?',
+    'mau tanya syarat akta kelahiran anak', '1', 'selamat pagi kak',
+]
+
+def load_sentences(count):
+    with open('data.json', encoding='utf-8') as f:
+        patterns = [p for intent in json.load(f)['intents'] for p in intent['patterns']]
+    rng = random.Random(42)
+    pool = patterns + QUERIES
+    return patterns, [rng.choice(pool) for _ in range(count)]
+
+# Jalur lama: training memakai word_tokenize + lemmatize, serving menambah filter isalpha
+def legacy_pipeline():
+    import nltk
+    notes = []
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+        tokenize = nltk.word_tokenize
+    except LookupError:
+        from nltk.tokenize import NLTKWordTokenizer
+        tokenize = NLTKWordTokenizer().tokenize
+        notes.append('tanpa punkt')
+    try:
+        nltk.data.find('corpora/wordnet')
+        from nltk.stem import WordNetLemmatizer
+        lemmatize = WordNetLemmatizer().lemmatize
+    except LookupError:
+        lemmatize = lambda word: word
+        notes.append('tanpa wordnet')
+
+    ignore_words = {'?', '!', '.', ','}
+
+    def train(text):
+        return [lemmatize(w.lower()) for w in tokenize(text) if w not in ignore_words]
+
+    def serve(text):
+        return [lemmatize(w.lower()) for w in tokenize(text) if w.isalpha()]
+
+    return train, serve, notes
+
+def throughput(func, sentences):
+    started = time.perf_counter()
+    tokens = sum(len(func(s)) for s in sentences)
+    elapsed = time.perf_counter() - started
+    return tokens / elapsed, elapsed * 1e6 / len(sentences)
+
+# Persentase token pertanyaan warga yang dikenali kosakata hasil training
+def coverage(train, serve, patterns):
+    vocab = {t for p in patterns for t in train(p)}
+    tokens = [t for q in QUERIES for t in serve(q)]
+    return 100 * sum(t in vocab for t in tokens) / len(tokens)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    patterns, sentences = load_sentences(count)
+
+    legacy_train, legacy_serve, notes = legacy_pipeline()
+    tps, us = throughput(legacy_serve, sentences)
+    print(f"[i] NLTK lama ({', '.join(notes) or 'lengkap'}): {tps:10.0f} token/detik, {us:6.1f} µs/kalimat, "
+          f"{coverage(legacy_train, legacy_serve, patterns):5.1f}% token dikenali")
+
+    cold = Preprocessor(normalizer=DEFAULT_CONFIG['normalizer'], stemmer=DEFAULT_CONFIG['stemmer'])
+    tps, us = throughput(cold.tokens, sentences)
+    print(f"[i] preprocessing.py       : {tps:10.0f} token/detik, {us:6.1f} µs/kalimat, "
+          f"{coverage(cold.tokens, cold.tokens, patterns):5.1f}% token dikenali "
+          f"(cache {cold.cache_info()['hits']} hit / {cold.cache_info()['misses']} miss)")
+
+    uncached = Preprocessor(normalizer=DEFAULT_CONFIG['normalizer'], stemmer=DEFAULT_CONFIG['stemmer'], cache_size=0)
+    tps, us = throughput(uncached.tokens, sentences)
+    print(f"[i] preprocessing.py tanpa cache: {tps:10.0f} token/detik, {us:6.1f} µs/kalimat")
@@ -0,0 +1,82 @@
+# Benchmark pencarian pola TF-IDF: latensi search dibanding jalur klasifikasi model, dan
+# update inkremental (satu intent berubah) dibanding membangun ulang seluruh indeks.
+#   python benchmarks/retrieval.py [jumlah_pola_sintetis ...]
+# Pola sintetis disusun dari kata-kata data.json agar distribusi term mirip data asli.
+import os
+import sys
+import json
+import time
+import random
+import pickle
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import default_preprocessor
+from retrieval import TfidfRetriever
+from vectorizer import VocabularyIndex
+from inference import NumpyModel
+
+QUERIES = [
+    'gmn cara bikin ktp?', 'syarat sktmnya apa aja ya', 'apakah bisa daftar antrian ktp online',
+    'jam buka kantornya kapan', 'sy mau ngajuin pengaduan dong', 'kartu keluarganya hilang gimana',
+    'makasih infonya', 'brp lama pembuatan e-ktp', 'mau tanya syarat akta kelahiran anak', 'selamat pagi kak',
+]
+
+def synthetic_intents(intents, count, rng, per_intent=10):
+    words = sorted({w for i in intents for p in i['patterns'] for w in p.lower().split()})
+    synthetic = []
+    for n in range(0, count, per_intent):
+        patterns = [' '.join(rng.choice(words) for _ in range(rng.randint(3, 8))) for _ in range(per_intent)]
+        synthetic.append({'id': 100000 + n, 'tag': f'sintetis_{n}', 'patterns': patterns, 'responses': ['-']})
+    return intents + synthetic
+
+def per_query(func, queries, rounds=200):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for q in queries:
+            func(q)
+    return (time.perf_counter() - started) * 1e6 / (rounds * len(queries))
+
+# Jalur klasifikasi seperti di chatbot_engine: encode bag-of-words lalu forward pass NumPy
+def classifier_path(preprocessor):
+    if not os.path.exists('model.keras'):
+        return None
+    with open('texts.pkl', 'rb') as f:
+        words = pickle.load(f)
+    with open('labels.pkl', 'rb') as f:
+        classes = pickle.load(f)
+    vocab = VocabularyIndex(words, classes)
+    model = NumpyModel.from_keras('model.keras')
+    return lambda q: model.predict(vocab.encode(preprocessor.tokens(q)))
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [0, 10000, 50000]
+    rng = random.Random(3)
+    preprocessor = default_preprocessor()
+    with open('data.json', encoding='utf-8') as f:
+        base = json.load(f)['intents']
+    base = [dict(intent, id=intent.get('id', n)) for n, intent in enumerate(base)]
+
+    classify = classifier_path(preprocessor)
+    if classify is not None:
+        print(f"[i] klasifikasi model (encode + predict): {per_query(classify, QUERIES):7.1f} µs/pertanyaan")
+
+    for extra in sizes:
+        intents = synthetic_intents(base, extra, rng)
+
+        started = time.perf_counter()
+        retriever = TfidfRetriever.from_intents(intents, preprocessor.tokens)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        us = per_query(lambda q: retriever.search(preprocessor.tokens(q)), QUERIES, rounds=50 if extra else 200)
+        print(f"[i] {len(retriever):6} pola, {len(retriever.terms):5} term: search {us:7.1f} µs/pertanyaan, "
+              f"bangun ulang {build_ms:7.1f} ms")
+
+        # Admin mengubah satu intent: hanya pola intent itu yang ditokenisasi ulang
+        edited = dict(intents[0], patterns=intents[0]['patterns'] + ['pola tambahan dari admin'])
+        started = time.perf_counter()
+        updated = retriever.update([edited], [], preprocessor.tokens)
+        update_ms = (time.perf_counter() - started) * 1000
+        assert len(updated) == len(retriever) + 1
+        print(f"    update 1 intent: {update_ms:7.1f} ms ({build_ms / update_ms:4.1f}x lebih cepat dari bangun ulang)")
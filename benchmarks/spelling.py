@@ -0,0 +1,100 @@
+# Benchmark koreksi salah ketik: recall pada korpus typo dan latensi per lookup.
+#   python benchmarks/spelling.py [ukuran_kosakata ...]
+# Kosakata diambil dari texts.pkl lalu diperbesar dengan kata sintetis (suku kata bahasa
+# Indonesia) untuk melihat apakah latensi tetap di bawah satu milidetik.
+import os
+import sys
+import time
+import pickle
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spelling import SpellingIndex, bounded_distance, max_distance
+
+SYLLABLES = [c + v for c in 'bcdfghjklmnprstwy' for v in 'aiueo'] + ['ng', 'an', 'ny', 'kan', 'lah', 'nya', 'ter', 'ber']
+
+# Salah ketik yang benar-benar muncul di riwayat chat
+REAL_TYPOS = {
+    'keluraga': 'keluarga', 'kecamtan': 'kecamatan', 'antiran': 'antrian', 'pengadun': 'pengaduan',
+    'rangkasbitng': 'rangkasbitung', 'kelahrian': 'kelahiran', 'domisli': 'domisili', 'syart': 'syarat',
+    'pembuatn': 'pembuatan', 'keterangn': 'keterangan', 'pelayann': 'pelayanan', 'penduduj': 'penduduk',
+}
+
+def synthetic_words(count, rng, exclude):
+    words = set()
+    while len(words) < count:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5)))
+        if word not in exclude:
+            words.add(word)
+    return sorted(words)
+
+# Satu edit acak: hapus, sisip, ganti, atau tukar dua huruf bersebelahan
+def make_typo(word, rng):
+    i = rng.randrange(len(word))
+    kind = rng.choice(['delete', 'insert', 'replace', 'transpose'])
+    letter = rng.choice('abcdefghijklmnopqrstuvwxyz')
+    if kind == 'delete':
+        return word[:i] + word[i + 1:]
+    if kind == 'insert':
+        return word[:i] + letter + word[i:]
+    if kind == 'replace':
+        return word[:i] + letter + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+def typo_corpus(words, rng, count=2000):
+    candidates = [w for w in words if len(w) >= 5 and w.isalpha()]
+    corpus = dict(REAL_TYPOS)
+    while len(corpus) < count:
+        word = rng.choice(candidates)
+        typo = make_typo(word, rng)
+        if typo not in words and typo != word:
+            corpus.setdefault(typo, word)
+    return corpus
+
+# Pembanding: hitung jarak ke setiap kata di kosakata
+def linear_suggest(words, token):
+    limit = max_distance(len(token))
+    best = min(((bounded_distance(token, w, limit), w) for w in words), default=(limit + 1, None))
+    return best[1] if best[0] <= limit else None
+
+def measure(index, corpus, suggest):
+    hits = 0
+    started = time.perf_counter()
+    for typo, expected in corpus.items():
+        hits += suggest(typo) == expected
+    elapsed = time.perf_counter() - started
+    return 100 * hits / len(corpus), elapsed * 1e6 / len(corpus)
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [0, 10000, 50000]
+    rng = random.Random(7)
+    with open('texts.pkl', 'rb') as f:
+        vocabulary = pickle.load(f)
+
+    for extra in sizes:
+        words = vocabulary + synthetic_words(extra, rng, set(vocabulary))
+        corpus = typo_corpus(set(words), rng)
+
+        started = time.perf_counter()
+        index = SpellingIndex(words, cache_size=0)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        recall, us = measure(index, corpus, index.suggest)
+        real = sum(index.suggest(t) == w for t, w in REAL_TYPOS.items())
+        print(f"[i] {len(words):6} kata (indeks {build_ms:6.0f} ms): recall {recall:5.1f}% "
+              f"(typo nyata {real}/{len(REAL_TYPOS)}), {us:7.1f} µs/lookup")
+
+        # Token asing (huruf acak) biasanya tidak punya padanan: semua tahap kandidat dijalankan
+        noise = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(6, 10)))
+                 for _ in range(500)]
+        started = time.perf_counter()
+        corrected = sum(index.suggest(t) is not None for t in noise)
+        us = (time.perf_counter() - started) * 1e6 / len(noise)
+        print(f"    token acak: {us:7.1f} µs/lookup, {corrected} dari {len(noise)} dikoreksi")
+
+        sample = dict(list(corpus.items())[:30])
+        recall, us = measure(index, sample, lambda token: linear_suggest(index.words, token))
+        print(f"    pembanding scan linear: recall {recall:5.1f}%, {us:9.1f} µs/lookup")
@@ -0,0 +1,146 @@
+import os
+import time
+import queue
+import atexit
+import threading
+import psycopg2
+from psycopg2.extras import execute_values
+from config import get_db_connection
+
+
+class ChatLogWriter:
+    """Buffer write-behind untuk chat_history: pesan disimpan per batch dengan satu INSERT multi-row."""
+
+    def __init__(self, batch_size=100, flush_interval=1.0, max_queue=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._pending = []
+        self._stats = {'logged': 0, 'flushed': 0, 'batches': 0, 'dropped': 0, 'rejected': 0, 'failures': 0, 'last_error': None}
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='chat-log-writer', daemon=True)
+                self._thread.start()
+
+    # Catat satu percakapan; tidak pernah memblokir request
+    def log(self, user_id, message, response, intent=None, confidence=None):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((user_id, message, response, intent, confidence, time.monotonic()))
+            with self._lock:
+                self._stats['logged'] += 1
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+
+    def _drain(self, limit):
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while not self._stop.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            # Tunggu hingga batch penuh atau interval flush habis
+            while self._queue.qsize() < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._stop.wait(min(remaining, 0.05))
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            while True:
+                batch = self._pending or self._drain(self.batch_size)
+                self._pending = []
+                if not batch:
+                    return True
+                error = self._write(batch)
+                if error is None:
+                    continue
+                if isinstance(error, (psycopg2.DataError, psycopg2.IntegrityError)):
+                    # Satu baris yang tidak mungkin disimpan tidak boleh menahan seluruh log:
+                    # ulangi per baris dan buang baris yang ditolak database
+                    batch = self._write_each(batch)
+                if batch:
+                    # Database tidak bisa dihubungi: simpan untuk dicoba lagi pada flush berikutnya
+                    self._pending = batch
+                    return False
+
+    # Mengembalikan baris yang belum tersimpan karena error selain penolakan data
+    def _write_each(self, batch):
+        for i, item in enumerate(batch):
+            error = self._write([item])
+            if error is None:
+                continue
+            if not isinstance(error, (psycopg2.DataError, psycopg2.IntegrityError)):
+                return batch[i:]
+            with self._lock:
+                self._stats['rejected'] += 1
+            print(f"[!] Chat dari user {item[0]} dibuang: {error}")
+        return []
+
+    # Mengembalikan None jika berhasil, atau exception yang terjadi
+    def _write(self, batch):
+        now = time.monotonic()
+        # Waktu pesan dihitung dari jam database dikurangi umur antrean, agar konsisten dengan DEFAULT kolom
+        rows = [(user_id, message, response, intent, confidence, now - queued)
+                for user_id, message, response, intent, confidence, queued in batch]
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    execute_values(cur, """
+                        INSERT INTO chat_history (user_id, message, response, intent, confidence, timestamp)
+                        VALUES %s
+                    """, rows, template="(%s, %s, %s, %s, %s, LOCALTIMESTAMP - %s * INTERVAL '1 second')",
+                        page_size=len(rows))
+                    conn.commit()
+            with self._lock:
+                self._stats['flushed'] += len(rows)
+                self._stats['batches'] += 1
+            return None
+        except Exception as e:
+            with self._lock:
+                self._stats['failures'] += 1
+                self._stats['last_error'] = str(e)
+            print(f"[X] Gagal menyimpan {len(rows)} chat: {e}")
+            return e
+
+    # Hook shutdown: hentikan thread dan simpan semua pesan yang masih di buffer
+    def close(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize() + len(self._pending)
+        stats['batch_size'] = self.batch_size
+        stats['flush_interval'] = self.flush_interval
+        return stats
+
+
+chat_log = ChatLogWriter(
+    batch_size=int(os.getenv('CHAT_LOG_BATCH_SIZE', 100)),
+    flush_interval=float(os.getenv('CHAT_LOG_FLUSH_INTERVAL', 1.0)),
+    max_queue=int(os.getenv('CHAT_LOG_MAX_QUEUE', 10000))
+)
+atexit.register(chat_log.close)
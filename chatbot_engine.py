@@ -0,0 +1,476 @@
+import os
+import json
+import time
+import random
+import pickle
+import threading
+import numpy as np
+import model_registry
+from inference import NumpyModel
+from vectorizer import VocabularyIndex
+from batching import MicroBatcher
+from cache import TTLCache, FileFingerprint
+from preprocessing import get_preprocessor
+from spelling import SpellingIndex
+from retrieval import load_or_build
+
+ERROR_THRESHOLD = 0.25
+
+# Kata di luar kosakata dipetakan ke kata terdekat (lihat spelling.py); set 0 untuk mematikan
+SPELLING_CORRECTION = os.getenv('SPELLING_CORRECTION', '1') == '1'
+
+# Prediksi dengan probabilitas di bawah RETRIEVAL_THRESHOLD dicek ulang dengan pencarian pola
+# TF-IDF (lihat retrieval.py); hasil pencarian dipakai jika skor cosine-nya >= RETRIEVAL_MIN_SCORE
+RETRIEVAL_THRESHOLD = float(os.getenv('RETRIEVAL_THRESHOLD', 0.6))
+RETRIEVAL_MIN_SCORE = float(os.getenv('RETRIEVAL_MIN_SCORE', 0.5))
+
+# Artefak lama di root proyek, dipakai selama registry model masih kosong
+LEGACY_ARTIFACTS = {
+    'model.keras': 'model.keras',
+    'texts.pkl': 'texts.pkl',
+    'labels.pkl': 'labels.pkl',
+    'data.json': 'data.json',
+}
+
+class ModelBundle:
+    """Satu set artefak (model, kosakata, label, intents) dari versi yang sama."""
+
+    def __init__(self, version, paths, metadata=None):
+        self.version = version
+        # Teks diproses dengan konfigurasi yang sama seperti saat model ini dilatih
+        self.preprocessor = get_preprocessor((metadata or {}).get('preprocessing'))
+        self.model = NumpyModel.from_keras(paths['model.keras'])
+        with open(paths['data.json'], encoding='utf-8') as f:
+            self.intents = json.load(f)
+        with open(paths['texts.pkl'], 'rb') as f:
+            words = pickle.load(f)
+        with open(paths['labels.pkl'], 'rb') as f:
+            classes = pickle.load(f)
+        self.vocab = VocabularyIndex(words, classes)
+        self.responses = self.compile_responses(self.intents)
+        self.spelling = SpellingIndex(words) if SPELLING_CORRECTION else None
+
+        # Indeks pola untuk fallback, diperbarui dari log intent_changes setelah posisi change_id
+        self.retriever = load_or_build(os.path.dirname(paths['data.json']), self.intents['intents'],
+                                       self.preprocessor.tokens)
+        self.change_id = (metadata or {}).get('intent_change_id')
+
+        if self.model.input_dim != len(self.vocab) or self.model.output_dim != len(self.vocab.classes):
+            raise ValueError(f"Artefak versi '{version}' tidak konsisten (ukuran model ≠ kosakata/label)")
+
+    # Indeks tag -> respon dibangun sekali per versi; tag ganda memakai entri pertama
+    @staticmethod
+    def compile_responses(intents):
+        responses = {}
+        for intent in intents['intents']:
+            if intent['responses']:
+                responses.setdefault(intent['tag'], tuple(intent['responses']))
+        return responses
+
+
+# Muat artefak satu versi; manifest versi registry diverifikasi lebih dulu
+def load_bundle(version, paths=None, registry_dir=model_registry.REGISTRY_DIR):
+    metadata = {}
+    if version.startswith('legacy-'):
+        paths = paths or dict(LEGACY_ARTIFACTS)
+    else:
+        metadata = model_registry.verify(version, registry_dir).get('metadata', {})
+        paths = paths or model_registry.artifact_paths(version, registry_dir)
+    return ModelBundle(version, paths, metadata)
+
+
+class ChatbotEngine:
+    """Model chatbot yang dimuat saat dibutuhkan (lazy) dan diganti otomatis saat ada versi baru."""
+
+    def __init__(self, registry_dir=model_registry.REGISTRY_DIR, check_interval=None):
+        self.registry_dir = registry_dir
+
+        self._lock = threading.Lock()
+        self._loading = None
+        self._reloading = False
+        self.loaded = False
+        self.warmed_up = False
+        self.error = None
+        self.startup_ms = {}
+        self.last_swap = None
+
+        self.bundle = None
+
+        # Pointer versi aktif (atau artefak lama) dicek paling sering sekali per interval
+        if check_interval is None:
+            check_interval = float(os.getenv('MODEL_CHECK_INTERVAL', 2))
+        self._watch = FileFingerprint(
+            [model_registry.pointer_path(registry_dir)] + list(LEGACY_ARTIFACTS.values()),
+            interval=check_interval
+        )
+        self._watched = None
+
+        # Permintaan /get yang datang bersamaan digabung menjadi satu forward pass
+        self.batcher = MicroBatcher(
+            self._predict_matrix,
+            max_batch_size=int(os.getenv('BATCH_MAX_SIZE', 32)),
+            max_wait=float(os.getenv('BATCH_MAX_WAIT_MS', 2)) / 1000
+        )
+
+        # Perubahan intent dari admin diterapkan ke indeks pencarian pola oleh satu thread per proses,
+        # terpisah dari request; 0 mematikan sinkronisasi. Saat database gagal jeda diperpanjang.
+        self._sync_interval = float(os.getenv('RETRIEVAL_SYNC_INTERVAL', 5))
+        self._sync_max_backoff = float(os.getenv('RETRIEVAL_SYNC_MAX_BACKOFF', 300))
+        self._sync_lock = threading.Lock()
+        self._sync_thread = None
+        self._sync_pid = None
+
+        # Cache hasil prediksi per bag-of-words, dikosongkan otomatis saat versi model berganti
+        self.intent_cache = TTLCache(
+            maxsize=int(os.getenv('INTENT_CACHE_SIZE', 2048)),
+            ttl=float(os.getenv('INTENT_CACHE_TTL', 600))
+        )
+
+    # Versi yang seharusnya dilayani: isi models/CURRENT, atau sidik artefak lama
+    def _source(self):
+        version = model_registry.current_version(self.registry_dir)
+        if version:
+            return version, model_registry.artifact_paths(version, self.registry_dir)
+        legacy = FileFingerprint(LEGACY_ARTIFACTS.values()).current()
+        return f"legacy-{abs(hash(legacy)):x}", dict(LEGACY_ARTIFACTS)
+
+    def _load_bundle(self):
+        version, paths = self._source()
+        return load_bundle(version, paths, self.registry_dir)
+
+    def load(self):
+        timings = {}
+        started = time.perf_counter()
+
+        t = time.perf_counter()
+        self._watched = self._watch.current()
+        self.bundle = self._load_bundle()
+        timings['model'] = (time.perf_counter() - t) * 1000
+
+        self.loaded = True
+
+        t = time.perf_counter()
+        self.warm_up()
+        timings['warm_up'] = (time.perf_counter() - t) * 1000
+
+        timings['total'] = (time.perf_counter() - started) * 1000
+        self.startup_ms = {k: round(v, 2) for k, v in timings.items()}
+        print("[✓] Model chatbot versi {version} siap dalam {total:.0f} ms "
+              "(model {model:.0f} ms, warm-up {warm_up:.0f} ms)"
+              .format(version=self.bundle.version, **timings))
+
+    # Jalankan satu inferensi awal agar pengguna pertama tidak menanggung biaya inisialisasi
+    def warm_up(self, bundle=None):
+        bundle = bundle or self.bundle
+        self.clean_up_sentence('halo selamat pagi', bundle)
+        self.batcher.predict(np.zeros(len(bundle.vocab), dtype=np.float32), bundle.model.predict)
+        self.warmed_up = True
+
+    def ensure_loaded(self):
+        if self.loaded:
+            self._check_for_update()
+            self._ensure_retriever_sync()
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            try:
+                self.load()
+                self.error = None
+            except Exception as e:
+                self.error = str(e)
+                raise
+        self._ensure_retriever_sync()
+
+    # Muat model di thread terpisah agar proses worker bisa langsung menerima request
+    def start_background_load(self):
+        with self._lock:
+            if self.loaded or (self._loading and self._loading.is_alive()):
+                return
+
+            def run():
+                try:
+                    self.ensure_loaded()
+                except Exception as e:
+                    print(f"[X] Gagal memuat model chatbot: {e}")
+
+            self._loading = threading.Thread(target=run, name='chatbot-loader', daemon=True)
+            self._loading.start()
+
+    # Jika pointer versi berubah, muat versi baru di background lalu tukar dalam satu assignment
+    def _check_for_update(self):
+        watched = self._watch.current()
+        if watched == self._watched or self._reloading:
+            return
+        with self._lock:
+            if watched == self._watched or self._reloading:
+                return
+            self._reloading = True
+            self._watched = watched
+
+        def run():
+            try:
+                self.reload()
+            except Exception as e:
+                self.error = f"Gagal memuat versi baru: {e}"
+                print(f"[X] {self.error}")
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=run, name='chatbot-reloader', daemon=True).start()
+
+    def reload(self):
+        bundle = self._load_bundle()
+        if self.bundle is not None and bundle.version == self.bundle.version:
+            return self.bundle
+        self.warm_up(bundle)
+        previous, self.bundle = self.bundle, bundle
+        self.last_swap = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.error = None
+        print(f"[✓] Model chatbot diganti: {previous.version if previous else '-'} → {bundle.version}")
+        return bundle
+
+    # Thread dibuat ulang setelah fork worker gunicorn; request sendiri tidak pernah menyentuh database
+    def _ensure_retriever_sync(self):
+        if self._sync_interval <= 0 or (self._sync_thread is not None and self._sync_pid == os.getpid()):
+            return
+        with self._sync_lock:
+            if self._sync_thread is not None and self._sync_pid == os.getpid():
+                return
+            self._sync_pid = os.getpid()
+            self._sync_thread = threading.Thread(target=self._run_retriever_sync, name='retriever-sync',
+                                                 daemon=True)
+            self._sync_thread.start()
+
+    def _run_retriever_sync(self):
+        delay, failing = self._sync_interval, False
+        while True:
+            time.sleep(delay)
+            try:
+                self.sync_retriever()
+            except Exception as e:
+                if not failing:
+                    print(f"[!] Gagal memperbarui indeks pola, dicoba lagi dengan jeda bertahap: {e}")
+                failing = True
+                delay = min(delay * 2, self._sync_max_backoff)
+                continue
+            if failing:
+                print("[✓] Indeks pola kembali diperbarui dari log perubahan intent")
+            delay, failing = self._sync_interval, False
+
+    # Terapkan entri baru di log intent_changes: hanya intent yang berubah yang dibaca dan
+    # ditokenisasi ulang, lalu indeks baru menggantikan yang lama dalam satu assignment
+    def sync_retriever(self, bundle=None):
+        from config import get_db_connection
+        import intent_store
+
+        bundle = bundle or self.bundle
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                if bundle.change_id is None:
+                    # Model tanpa posisi log (artefak lama): mulai dari posisi sekarang
+                    bundle.change_id = intent_store.latest_change(cur)
+                    return 0
+                position, ids = intent_store.changes_since(cur, bundle.change_id)
+                if not ids:
+                    return 0
+                current = intent_store.fetch_intents(cur, ids=ids)
+
+        changed = [row for rows in current.values() for row in rows]
+        removed = set(ids) - {row['id'] for row in changed}
+        bundle.retriever = bundle.retriever.update(changed, removed, bundle.preprocessor.tokens)
+        bundle.change_id = position
+        return len(ids)
+
+    def status(self):
+        return {
+            'ready': self.loaded and self.warmed_up,
+            'model_loaded': self.loaded,
+            'warmed_up': self.warmed_up,
+            'version': self.bundle.version if self.bundle else None,
+            'last_swap': self.last_swap,
+            'preprocessing': dict(self.bundle.preprocessor.config,
+                                  cache=self.bundle.preprocessor.cache_info()) if self.bundle else None,
+            'spelling': dict(words=len(self.bundle.spelling), cache=self.bundle.spelling.cache_info())
+                        if self.bundle and self.bundle.spelling else None,
+            'retrieval': dict(self.bundle.retriever.stats(), change_id=self.bundle.change_id)
+                         if self.bundle else None,
+            'startup_ms': self.startup_ms,
+            'error': self.error,
+        }
+
+    def _predict_matrix(self, matrix):
+        return self.bundle.model.predict(matrix)
+
+    # Fungsi membersihkan input pengguna (pipeline yang sama dengan training, lihat preprocessing.py)
+    def clean_up_sentence(self, sentence, bundle=None):
+        return (bundle or self.bundle).preprocessor.tokens(sentence)
+
+    # Prediksi kelas intent dari input pengguna
+    def predict_class(self, sentence, bundle=None):
+        if bundle is None:
+            self.ensure_loaded()
+            bundle = self.bundle
+
+        return self._classify(self._corrected(self.clean_up_sentence(sentence, bundle), bundle), bundle)
+
+    def _corrected(self, tokens, bundle):
+        return bundle.spelling.correct(tokens) if bundle.spelling is not None else tokens
+
+    def _classify(self, tokens, bundle):
+        p = bundle.vocab.encode(tokens)
+        if not p.any():  # Jika tidak ada kata yang dikenali
+            return []
+
+        # Kalimat dengan bag-of-words yang sama pasti menghasilkan intent yang sama. Key memuat versi
+        # bundle; hanya bundle aktif yang mengosongkan cache, jadi permintaan yang masih memegang
+        # bundle lama saat hot-swap tidak membalik versi cache
+        if bundle is self.bundle:
+            self.intent_cache.ensure_version(bundle.version)
+        key = (bundle.version, tuple(np.flatnonzero(p).tolist()))
+        cached = self.intent_cache.get(key)
+        if cached is not None:
+            return cached
+
+        ints = self._rank(self.batcher.predict(p, bundle.model.predict), bundle)
+        self.intent_cache.set(key, ints)
+        return ints
+
+    def _rank(self, res, bundle):
+        results = [[i, r] for i, r in enumerate(res) if r > ERROR_THRESHOLD]
+        results.sort(key=lambda x: x[1], reverse=True)
+        return [{"intent": bundle.vocab.classes[r[0]], "probability": str(r[1])} for r in results]
+
+    # Mendapatkan respons berdasarkan intent
+    def getResponse(self, ints, bundle=None):
+        bundle = bundle or self.bundle
+        if not ints:
+            return self.get_noanswer_response(bundle)
+
+        tag = ints[0]['intent']
+        # Intent yang dihapus admin (atau tag lamanya) tidak dijawab lagi walau model masih memprediksinya
+        if tag in bundle.retriever.removed_tags:
+            return self.get_noanswer_response(bundle)
+        # Respon yang diubah admin setelah training langsung dipakai
+        responses = bundle.retriever.responses.get(tag) or bundle.responses.get(tag)
+        if responses:
+            return {
+                "response": random.choice(responses),
+                "intent": tag
+            }
+
+        return self.get_noanswer_response(bundle)
+
+    def get_noanswer_response(self, bundle=None):
+        bundle = bundle or self.bundle
+        responses = bundle.responses.get('noanswer')
+        if responses:
+            return {
+                "response": random.choice(responses),
+                "intent": 'noanswer'
+            }
+        # Fallback jika tag noanswer tidak ditemukan
+        return {
+            "response": "Maaf, saya tidak memahami pertanyaan Anda.",
+            "intent": "none"
+        }
+
+    # Pencarian pola untuk prediksi yang ragu; token yang dikenal indeks pola dipakai apa adanya
+    # (bisa berisi kata dari intent baru yang belum masuk kosakata model)
+    def retrieve(self, raw_tokens, tokens, bundle):
+        retriever = bundle.retriever
+        query = [r if r in retriever.term_index else t for r, t in zip(raw_tokens, tokens)]
+        hits = retriever.search(query, top=1)
+        if hits and hits[0][1] >= RETRIEVAL_MIN_SCORE:
+            return hits[0]
+        return None
+
+    # Fungsi utama chatbot; satu permintaan selalu memakai satu versi bundle yang sama
+    def chatbot_response(self, msg):
+        self.ensure_loaded()
+        bundle = self.bundle
+        raw_tokens = self.clean_up_sentence(msg, bundle)
+        tokens = self._corrected(raw_tokens, bundle)
+        return self._respond(raw_tokens, tokens, self._classify(tokens, bundle), bundle)
+
+    def _respond(self, raw_tokens, tokens, ints, bundle):
+        confidence = float(ints[0]['probability']) if ints else None
+
+        if confidence is None or confidence < RETRIEVAL_THRESHOLD:
+            hit = self.retrieve(raw_tokens, tokens, bundle)
+            if hit is not None and (not ints or hit[0] != ints[0]['intent']):
+                tag, score = hit
+                result = self.getResponse([{'intent': tag, 'probability': str(score)}], bundle)
+                if result['intent'] == tag:
+                    result['confidence'] = score
+                    result['source'] = 'retrieval'
+                    return result
+
+        result = self.getResponse(ints, bundle)
+        result['confidence'] = confidence
+        return result
+
+    # Banyak pesan sekaligus (kiosk, uji regresi FAQ): semua pesan dipreprocess bersama, baris
+    # yang belum ada di cache intent diprediksi dalam satu forward pass matriks (tanpa micro-batcher)
+    def chatbot_batch(self, messages):
+        self.ensure_loaded()
+        bundle = self.bundle
+        started = time.perf_counter()
+
+        raw = [self.clean_up_sentence(msg, bundle) for msg in messages]
+        corrected = [self._corrected(tokens, bundle) for tokens in raw]
+        matrix = bundle.vocab.encode_batch(corrected)
+        preprocessed = time.perf_counter()
+
+        if bundle is self.bundle:
+            self.intent_cache.ensure_version(bundle.version)
+        ints, pending, keys = [[] for _ in messages], [], {}
+        cached_rows = 0
+        for row, vector in enumerate(matrix):
+            columns = np.flatnonzero(vector)
+            if not len(columns):
+                continue
+            key = (bundle.version, tuple(columns.tolist()))
+            cached = self.intent_cache.get(key)
+            if cached is not None:
+                # Hasil cache bisa berupa [] (tidak ada intent di atas ERROR_THRESHOLD)
+                ints[row] = cached
+                cached_rows += 1
+            elif key in keys:
+                # Pesan dengan bag-of-words sama di batch yang sama cukup dihitung sekali
+                keys[key].append(row)
+            else:
+                keys[key] = [row]
+                pending.append(key)
+
+        if pending:
+            res = bundle.model.predict(matrix[[keys[key][0] for key in pending]])
+            for key, probabilities in zip(pending, res):
+                ranked = self._rank(probabilities, bundle)
+                self.intent_cache.set(key, ranked)
+                for row in keys[key]:
+                    ints[row] = ranked
+        predicted = time.perf_counter()
+
+        results = [self._respond(r, t, i, bundle) for r, t, i in zip(raw, corrected, ints)]
+        finished = time.perf_counter()
+
+        timing = {
+            'preprocess_ms': round((preprocessed - started) * 1000, 3),
+            'predict_ms': round((predicted - preprocessed) * 1000, 3),
+            'respond_ms': round((finished - predicted) * 1000, 3),
+            'total_ms': round((finished - started) * 1000, 3),
+            'predicted_rows': len(pending),
+            'cached_rows': cached_rows,
+        }
+        return results, timing, bundle.version
+
+engine = ChatbotEngine()
+
+# Mode startup: 'background' (default), 'eager' atau 'lazy'
+def start(mode=None):
+    mode = mode or os.getenv('CHATBOT_STARTUP', 'background')
+    if mode == 'eager':
+        engine.ensure_loaded()
+    elif mode == 'background':
+        engine.start_background_load()
@@ -1,5 +1,9 @@
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load variabel lingkungan dari .env
@@ -14,10 +18,228 @@ DATABASE_CONFIG = {
     'port': os.getenv('DB_PORT')
 }
 
+# Konfigurasi pool koneksi
+POOL_CONFIG = {
+    'minconn': int(os.getenv('DB_POOL_MIN', 1)),
+    'maxconn': int(os.getenv('DB_POOL_MAX', 10)),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+    'check_idle': float(os.getenv('DB_POOL_CHECK_IDLE', 30)),
+    'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+}
+
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    pass
+
+
+class ConnectionPool:
+    """Pool koneksi thread-safe dengan health check saat checkout dan statistik pemakaian."""
+
+    def __init__(self, minconn=1, maxconn=10, timeout=10, check_idle=30, max_lifetime=1800, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self.max_lifetime = max_lifetime
+        self.connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = []        # (conn, dibuat_pada, terakhir_dipakai)
+        self._in_use = {}      # id(conn) -> dibuat_pada
+        self._size = 0
+        self._stats = {
+            'checkouts': 0, 'waits': 0, 'wait_time_total': 0.0, 'wait_time_max': 0.0,
+            'timeouts': 0, 'created': 0, 'recycled': 0, 'broken': 0,
+        }
+
+        for _ in range(minconn):
+            conn = self._connect()
+            self._idle.append((conn, time.monotonic(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        with self._cond:
+            self._stats['created'] += 1
+        return conn
+
+    # Koneksi dianggap sehat jika belum ditutup dan (bila lama menganggur) lolos SELECT 1
+    def _healthy(self, conn, created, last_used):
+        now = time.monotonic()
+        if conn.closed:
+            return False
+        if now - created > self.max_lifetime:
+            with self._cond:
+                self._stats['recycled'] += 1
+            return False
+        if now - last_used > self.check_idle:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def getconn(self):
+        started = time.monotonic()
+        waited = False
+
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f"Semua {self.maxconn} koneksi database sedang dipakai")
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, created, last_used = self._idle.pop()
+                else:
+                    conn, created, last_used = None, time.monotonic(), time.monotonic()
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._healthy(conn, created, last_used):
+                self._discard(conn)
+                continue
+
+            wait = time.monotonic() - started
+            with self._cond:
+                self._in_use[id(conn)] = created
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                    self._stats['wait_time_total'] += wait
+                    self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait)
+            return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    # Kembalikan koneksi ke pool; koneksi rusak atau yang diminta ditutup akan dibuang
+    def putconn(self, conn, close=False):
+        with self._cond:
+            created = self._in_use.pop(id(conn), None)
+        if created is None:
+            return
+
+        if not close and not conn.closed:
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except psycopg2.Error:
+                close = True
+
+        if close or conn.closed:
+            if not close:
+                with self._cond:
+                    self._stats['broken'] += 1
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, created, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            for conn, _, _ in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'minconn': self.minconn,
+                'maxconn': self.maxconn,
+                'avg_wait_ms': stats['wait_time_total'] / stats['waits'] * 1000 if stats['waits'] else 0.0,
+                'max_wait_ms': stats['wait_time_max'] * 1000,
+            })
+            return stats
+
+
+class PooledConnection:
+    """Koneksi pinjaman dari pool. `with` melakukan commit/rollback lalu mengembalikannya ke pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __enter__(self):
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._conn is None:
+            return
+        try:
+            if not self._conn.closed:
+                if exc_type is None:
+                    self._conn.commit()
+                else:
+                    self._conn.rollback()
+        finally:
+            self.release()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def release(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.putconn(conn)
+
+    # Tutup koneksi fisik (mis. koneksi worker yang memegang advisory lock)
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.putconn(conn, close=True)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(**POOL_CONFIG, **DATABASE_CONFIG)
+                _pool_pid = os.getpid()
+    return _pool
+
+def pool_stats():
+    return get_pool().stats() if _pool is not None else {}
+
 def get_db_connection():
     try:
-        conn = psycopg2.connect(**DATABASE_CONFIG)
-        return conn
+        pool = get_pool()
+        return PooledConnection(pool, pool.getconn())
+    except psycopg2.pool.PoolError:
+        raise
     except psycopg2.Error as e:
         print(f"Database connection error: {e.pgerror}")
         return None
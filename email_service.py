@@ -1,25 +1,241 @@
 from flask_mail import Mail, Message
 from flask import Flask
+from config import get_db_connection
+import smtplib
+import threading
+import time
 import os
 
 app = Flask(__name__)
 
-# Konfigurasi SMTP Gmail
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+# Konfigurasi SMTP (default Gmail); arahkan MAIL_SERVER/MAIL_PORT ke server SMTP lokal untuk pengujian
+app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', '1') == '1'
+app.config['MAIL_USE_SSL'] = os.getenv('MAIL_USE_SSL', '0') == '1'
+app.config['MAIL_SUPPRESS_SEND'] = os.getenv('MAIL_SUPPRESS_SEND', '0') == '1'
 app.config['MAIL_USERNAME'] = os.getenv('EMAIL_USER')  # Set di environment variable
 app.config['MAIL_PASSWORD'] = os.getenv('EMAIL_PASS')  # Set di environment variable
 
 mail = Mail(app)
 
+# Konfigurasi worker outbox
+EMAIL_CONFIG = {
+    'workers': int(os.getenv('EMAIL_WORKERS', 2)),
+    'batch_size': int(os.getenv('EMAIL_BATCH_SIZE', 20)),
+    'poll_interval': float(os.getenv('EMAIL_POLL_INTERVAL', 5)),
+    'max_attempts': int(os.getenv('EMAIL_MAX_ATTEMPTS', 5)),
+    'retry_base': float(os.getenv('EMAIL_RETRY_BASE', 30)),
+    'retry_max': float(os.getenv('EMAIL_RETRY_MAX', 3600)),
+    'smtp_idle': float(os.getenv('EMAIL_SMTP_IDLE', 30)),
+    'lock_timeout': float(os.getenv('EMAIL_LOCK_TIMEOUT', 600)),
+}
+
+_wake = threading.Event()
+_workers = []
+_workers_pid = None
+_workers_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'sent': 0, 'retried': 0, 'failed': 0, 'batches': 0, 'smtp_connects': 0}
+
+def _count(name, n=1):
+    with _stats_lock:
+        _stats[name] += n
+
+# Simpan email ke outbox; pengiriman dilakukan worker di background
 def send_email(recipient, subject, body):
     try:
-        msg = Message(subject, sender=app.config['MAIL_USERNAME'], recipients=[recipient])
-        msg.body = body
-        with app.app_context():
-            mail.send(msg)
-        return True
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO email_outbox (recipient, subject, body)
+                    VALUES (%s, %s, %s)
+                """, (recipient, subject, body))
+                conn.commit()
     except Exception as e:
-        print(f"Error sending email: {e}")
+        print(f"Error queueing email: {e}")
         return False
+
+    start_embedded_workers()
+    _wake.set()
+    return True
+
+# Ambil sekumpulan email yang jatuh tempo; SKIP LOCKED agar beberapa worker tidak mengambil email yang sama
+def _claim_batch(limit):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE email_outbox
+                SET status = 'sending', attempts = attempts + 1, locked_at = NOW()
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE (status = 'pending' AND next_attempt_at <= NOW())
+                       OR (status = 'sending' AND locked_at < NOW() - %s * INTERVAL '1 second')
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, recipient, subject, body, attempts
+            """, (EMAIL_CONFIG['lock_timeout'], limit))
+            rows = cur.fetchall()
+            conn.commit()
+    return sorted(rows)
+
+def _mark_sent(ids):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE email_outbox
+                SET status = 'sent', sent_at = NOW(), locked_at = NULL, last_error = NULL
+                WHERE id = ANY(%s)
+            """, (ids,))
+            conn.commit()
+
+# Gagal sementara: jadwalkan ulang dengan backoff eksponensial; gagal permanen atau melebihi batas: 'failed'
+def _mark_error(email_id, attempts, error, permanent=False):
+    failed = permanent or attempts >= EMAIL_CONFIG['max_attempts']
+    delay = min(EMAIL_CONFIG['retry_base'] * 2 ** (attempts - 1), EMAIL_CONFIG['retry_max'])
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE email_outbox
+                SET status = %s, last_error = %s, locked_at = NULL,
+                    next_attempt_at = NOW() + %s * INTERVAL '1 second'
+                WHERE id = %s
+            """, ('failed' if failed else 'pending', str(error)[:1000], delay, email_id))
+            conn.commit()
+    _count('failed' if failed else 'retried')
+    print(f"[{'X' if failed else '!'}] Email #{email_id} gagal dikirim (percobaan {attempts}): {error}")
+
+class _SmtpSession:
+    """Koneksi SMTP yang dipakai ulang antar batch dan ditutup setelah menganggur."""
+
+    def __init__(self):
+        self.connection = None
+        self.last_used = 0.0
+
+    def get(self):
+        if self.connection is not None and time.monotonic() - self.last_used > EMAIL_CONFIG['smtp_idle']:
+            self.close()
+        if self.connection is None:
+            self.connection = mail.connect().__enter__()
+            _count('smtp_connects')
+        self.last_used = time.monotonic()
+        return self.connection
+
+    def close(self):
+        connection, self.connection = self.connection, None
+        if connection is not None and connection.host is not None:
+            try:
+                connection.host.quit()
+            except smtplib.SMTPException:
+                connection.host.close()
+            except OSError:
+                pass
+
+# Email yang sudah terkirim ditandai 'sent' di finally: error database atau error lain di tengah batch
+# tidak membuat email itu tertahan di 'sending' lalu dikirim ulang setelah lock_timeout
+def _deliver(batch, session):
+    sent = []
+    try:
+        for i, (email_id, recipient, subject, body, attempts) in enumerate(batch):
+            try:
+                msg = Message(subject, sender=app.config['MAIL_USERNAME'], recipients=[recipient])
+                msg.body = body
+                session.get().send(msg)
+                sent.append(email_id)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                # Balasan 5xx untuk email ini (alamat ditolak dsb.) tidak akan berhasil jika diulang;
+                # penolakan penerima 4xx (mis. greylisting 450/451) tetap dicoba lagi
+                if isinstance(e, smtplib.SMTPRecipientsRefused):
+                    codes = [code for code, _ in e.recipients.values()]
+                    permanent = bool(codes) and all(code >= 500 for code in codes)
+                else:
+                    permanent = 500 <= e.smtp_code < 600
+                _mark_error(email_id, attempts, e, permanent=permanent)
+            except (smtplib.SMTPException, OSError) as e:
+                # Server tidak bisa dihubungi atau koneksi terputus: sisa batch dijadwalkan ulang
+                session.close()
+                for email_id, _, _, _, attempts in batch[i:]:
+                    _mark_error(email_id, attempts, e)
+                break
+            except Exception as e:
+                # Error di luar SMTP (header tidak valid, encoding, dsb.) hanya mengenai email ini
+                _mark_error(email_id, attempts, e)
+    finally:
+        if sent:
+            _mark_sent(sent)
+            _count('sent', len(sent))
+        _count('batches')
+
+# Loop worker: kirim email yang jatuh tempo, tidur sampai dibangunkan send_email atau interval poll habis
+def run_worker(stop=None, once=False):
+    session = _SmtpSession()
+    try:
+        with app.app_context():
+            while stop is None or not stop.is_set():
+                # Sinyal dihapus sebelum membaca outbox, bukan setelah bangun: email yang masuk setelah
+                # titik ini membangunkan semua worker yang menunggu, dan worker yang menghapus sinyal
+                # selalu membaca outbox sesudahnya, jadi tidak ada sinyal untuk worker lain yang hilang
+                _wake.clear()
+                try:
+                    batch = _claim_batch(EMAIL_CONFIG['batch_size'])
+                    if batch:
+                        _deliver(batch, session)
+                        continue
+                except Exception as e:
+                    # Thread tetap hidup; email yang belum selesai diambil lagi setelah lock_timeout
+                    print(f"[X] Worker email gagal memproses outbox: {e}")
+                    session.close()
+                    if once:
+                        return
+                    _wake.wait(EMAIL_CONFIG['poll_interval'])
+                    continue
+
+                if once:
+                    return
+                if session.connection is not None and time.monotonic() - session.last_used > EMAIL_CONFIG['smtp_idle']:
+                    session.close()
+                _wake.wait(EMAIL_CONFIG['poll_interval'])
+    finally:
+        session.close()
+
+# Worker berupa thread di proses web (dibuat ulang setelah fork worker gunicorn)
+def start_embedded_workers():
+    global _workers, _workers_pid
+    if os.getenv('EMAIL_WORKER', 'embedded') != 'embedded':
+        return
+    if _workers_pid == os.getpid() and all(t.is_alive() for t in _workers):
+        return
+    with _workers_lock:
+        if _workers_pid == os.getpid() and all(t.is_alive() for t in _workers):
+            return
+        _workers = [t for t in _workers if t.is_alive()] if _workers_pid == os.getpid() else []
+        for i in range(len(_workers), EMAIL_CONFIG['workers']):
+            thread = threading.Thread(target=run_worker, name=f'email-worker-{i}', daemon=True)
+            thread.start()
+            _workers.append(thread)
+        _workers_pid = os.getpid()
+
+def outbox_stats():
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT status, COUNT(*),
+                       EXTRACT(EPOCH FROM NOW() - MIN(created_at))
+                FROM email_outbox
+                GROUP BY status
+            """)
+            rows = cur.fetchall()
+
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['outbox'] = {status: count for status, count, _ in rows}
+    stats['oldest_pending_s'] = next((float(age) for status, _, age in rows if status == 'pending'), None)
+    stats['workers'] = sum(t.is_alive() for t in _workers) if _workers_pid == os.getpid() else 0
+    return stats
+
+
+if __name__ == "__main__":
+    print("[i] Worker email aktif")
+    run_worker()
@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import multiprocessing
+import numpy as np
+import model_registry
+from config import get_db_connection
+
+# Pesan per chunk yang dibaca dari cursor server-side dan diklasifikasi sekaligus
+CHUNK_SIZE = int(os.getenv('EVAL_CHUNK_SIZE', 2000))
+# Chunk yang boleh menunggu di pool per worker; membatasi memori berapa pun jumlah baris
+MAX_PENDING_PER_WORKER = 2
+# Batas kiri bin histogram confidence (bin terakhir mencakup 1.0)
+HISTOGRAM_BINS = np.linspace(0, 1, 11)
+# Perpindahan intent antar versi yang dilaporkan
+TOP_TRANSITIONS = 20
+
+NOANSWER = 'noanswer'
+# Label noanswer di chat_history: 'none' dicatat jika data tidak punya tag noanswer
+NOANSWER_LABELS = {NOANSWER, 'none'}
+
+_bundles = {}
+_engine = None
+
+
+def resolve_version(name=None):
+    if name in (None, 'current'):
+        name = model_registry.current_version()
+    return name or 'legacy'
+
+# Dicek di proses utama sebelum pool dibuat: versi yang salah ketik dilaporkan sebagai RegistryError,
+# bukan BrokenProcessPool dari initializer worker
+def check_version(version):
+    if version != 'legacy':
+        model_registry.verify(version)
+        return
+    from chatbot_engine import LEGACY_ARTIFACTS
+    missing = [name for name, path in LEGACY_ARTIFACTS.items() if not os.path.exists(path)]
+    if missing:
+        raise model_registry.RegistryError(f"Artefak legacy tidak ditemukan: {', '.join(missing)}")
+
+# Dijalankan sekali per proses worker: muat model versi yang dievaluasi
+def _init_worker(versions):
+    global _engine
+    from chatbot_engine import ChatbotEngine, load_bundle
+    # Hanya dipakai untuk logika keputusan /get (_rank, retrieval, getResponse), tanpa model aktif
+    _engine = ChatbotEngine()
+    for version in versions:
+        _bundles[version] = load_bundle(version if version != 'legacy' else 'legacy-eval')
+
+def normalize_intent(intent):
+    return NOANSWER if intent in NOANSWER_LABELS else intent
+
+# Klasifikasi satu chunk dengan prosedur yang sama seperti /get: preprocessing dan prediksi sebagai
+# satu matriks, lalu tiap baris lewat _respond (ambang ERROR_THRESHOLD, fallback pencarian pola,
+# intent tanpa respon menjadi noanswer). Confidence retrieval adalah skor kemiripan pola.
+def classify(bundle, messages):
+    raw = [bundle.preprocessor.tokens(m) for m in messages]
+    tokens = [_engine._corrected(t, bundle) for t in raw]
+    matrix = bundle.vocab.encode_batch(tokens)
+    probabilities = bundle.model.predict(matrix)
+
+    intents, confidence = [], np.zeros(len(messages))
+    for row, (r, t, vector) in enumerate(zip(raw, tokens, matrix)):
+        ints = _engine._rank(probabilities[row], bundle) if vector.any() else []
+        result = _engine._respond(r, t, ints, bundle)
+        intents.append(normalize_intent(result['intent']))
+        confidence[row] = result['confidence'] or 0.0
+    answered = np.array([i != NOANSWER for i in intents], dtype=bool)
+    return intents, confidence, answered
+
+def _histogram(confidence):
+    return np.histogram(np.clip(confidence, 0, 1), bins=HISTOGRAM_BINS)[0]
+
+# Agregat satu chunk; hanya hitungan kecil yang dikirim balik ke proses utama
+def evaluate_chunk(rows, versions):
+    messages = [row[0] for row in rows]
+    result = {'rows': len(rows), 'models': {}}
+
+    predictions = []
+    for version in versions:
+        intents, confidence, answered = classify(_bundles[version], messages)
+        predictions.append(intents)
+        result['models'][version] = {
+            'intents': Counter(intents),
+            'histogram': _histogram(confidence[answered]),
+            'confidence_sum': float(confidence[answered].sum()),
+            'answered': int(answered.sum()),
+        }
+
+    # Intent yang dicatat saat menjawab /get (kolom intent/confidence chat_history)
+    logged = [normalize_intent(row[1]) if row[1] else None for row in rows]
+    result['logged'] = {
+        'intents': Counter(i for i in logged if i),
+        'agreement': sum(1 for i, p in zip(logged, predictions[0]) if i and i == p),
+        'with_intent': sum(1 for i in logged if i),
+    }
+
+    if len(versions) > 1:
+        pairs = Counter((a, b) for a, b in zip(predictions[0], predictions[1]))
+        result['agreement'] = sum(n for (a, b), n in pairs.items() if a == b)
+        result['transitions'] = Counter({pair: n for pair, n in pairs.items() if pair[0] != pair[1]})
+    return result
+
+def _merge(total, part):
+    total['rows'] += part['rows']
+    for version, stats in part['models'].items():
+        current = total['models'].setdefault(version, {
+            'intents': Counter(), 'histogram': np.zeros(len(HISTOGRAM_BINS) - 1, dtype=np.int64),
+            'confidence_sum': 0.0, 'answered': 0,
+        })
+        current['intents'].update(stats['intents'])
+        current['histogram'] += stats['histogram']
+        current['confidence_sum'] += stats['confidence_sum']
+        current['answered'] += stats['answered']
+    total['logged']['intents'].update(part['logged']['intents'])
+    total['logged']['agreement'] += part['logged']['agreement']
+    total['logged']['with_intent'] += part['logged']['with_intent']
+    if 'agreement' in part:
+        total['agreement'] = total.get('agreement', 0) + part['agreement']
+        total.setdefault('transitions', Counter()).update(part['transitions'])
+
+# Baca chat_history lewat cursor bernama (server-side): hanya satu chunk berada di memori klien
+def stream_messages(since=None, until=None, chunk_size=CHUNK_SIZE):
+    conditions, params = [], []
+    if since:
+        conditions.append("timestamp >= %s")
+        params.append(since)
+    if until:
+        conditions.append("timestamp < %s")
+        params.append(until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with get_db_connection() as conn:
+        with conn.cursor(name='evaluation_chat_history') as cur:
+            cur.execute(f"SELECT message, intent FROM chat_history {where}", params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+
+# Jensen-Shannon divergence (basis 2, 0..1) antara dua distribusi intent
+def js_divergence(a, b):
+    tags = sorted(set(a) | set(b))
+    p = np.array([a.get(t, 0) for t in tags], dtype=np.float64)
+    q = np.array([b.get(t, 0) for t in tags], dtype=np.float64)
+    if not p.sum() or not q.sum():
+        return None
+    p, q = p / p.sum(), q / q.sum()
+    m = (p + q) / 2
+
+    def kl(x, y):
+        mask = x > 0
+        return float(np.sum(x[mask] * np.log2(x[mask] / y[mask])))
+    return round((kl(p, m) + kl(q, m)) / 2, 6)
+
+def _share(count, total):
+    return round(count / total, 4) if total else 0.0
+
+def build_report(total, versions, elapsed):
+    rows = total['rows']
+    report = {'rows': rows, 'duration_s': round(elapsed, 2),
+              'rows_per_s': round(rows / elapsed) if elapsed else None, 'models': {}}
+
+    labels = [f"{low:.1f}-{high:.1f}" for low, high in zip(HISTOGRAM_BINS[:-1], HISTOGRAM_BINS[1:])]
+    for version in versions:
+        stats = total['models'].get(version)
+        if stats is None:
+            continue
+        report['models'][version] = {
+            'noanswer_rate': _share(stats['intents'].get(NOANSWER, 0), rows),
+            'mean_confidence': round(stats['confidence_sum'] / stats['answered'], 4) if stats['answered'] else None,
+            'intents': {tag: {'count': n, 'share': _share(n, rows)} for tag, n in stats['intents'].most_common()},
+            'confidence_histogram': dict(zip(labels, stats['histogram'].tolist())),
+        }
+
+    logged = total['logged']
+    if logged['with_intent']:
+        report['logged'] = {
+            'rows': logged['with_intent'],
+            'agreement_with_model': _share(logged['agreement'], logged['with_intent']),
+            'js_divergence': js_divergence(logged['intents'], total['models'][versions[0]]['intents']),
+        }
+
+    if len(versions) > 1 and versions[1] in total['models']:
+        a, b = (total['models'][v]['intents'] for v in versions)
+        report['drift'] = {
+            'from': versions[0],
+            'to': versions[1],
+            'agreement': _share(total.get('agreement', 0), rows),
+            'js_divergence': js_divergence(a, b),
+            'share_change': {
+                tag: round(_share(b.get(tag, 0), rows) - _share(a.get(tag, 0), rows), 4)
+                for tag in sorted(set(a) | set(b), key=lambda t: -abs(b.get(t, 0) - a.get(t, 0)))
+            },
+            'top_transitions': [
+                {'from': x, 'to': y, 'count': n}
+                for (x, y), n in total.get('transitions', Counter()).most_common(TOP_TRANSITIONS)
+            ],
+        }
+    return report
+
+# Evaluasi seluruh chat_history (atau rentang waktu) terhadap satu atau dua versi model.
+# Chunk dikirim ke pool proses; jumlah chunk yang menunggu dibatasi agar memori tetap konstan.
+def evaluate(model=None, compare=None, since=None, until=None, workers=None, chunk_size=CHUNK_SIZE):
+    versions = [resolve_version(model)] + ([resolve_version(compare)] if compare else [])
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Versi pembanding sama dengan versi yang dievaluasi ({versions[0]})")
+    for version in versions:
+        check_version(version)
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * MAX_PENDING_PER_WORKER
+
+    total = {'rows': 0, 'models': {}, 'logged': {'intents': Counter(), 'agreement': 0, 'with_intent': 0}}
+    started = time.perf_counter()
+    # spawn: worker tidak mewarisi koneksi database atau state TensorFlow proses utama
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(versions,)) as pool:
+        pending = set()
+        for rows in stream_messages(since, until, chunk_size):
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _merge(total, future.result())
+            pending.add(pool.submit(evaluate_chunk, rows, versions))
+        for future in pending:
+            _merge(total, future.result())
+
+    if not total['rows']:
+        raise ValueError("Tidak ada pesan di chat_history pada rentang waktu tersebut")
+    return build_report(total, versions, time.perf_counter() - started)
+
+def print_report(report):
+    print(f"[✓] {report['rows']} pesan dievaluasi dalam {report['duration_s']} detik ({report['rows_per_s']} pesan/detik)")
+    for version, stats in report['models'].items():
+        print(f"[i] Versi {version}: noanswer {stats['noanswer_rate']:.1%}, "
+              f"rata-rata confidence {stats['mean_confidence']}")
+        for tag, item in list(stats['intents'].items())[:10]:
+            print(f"      {tag:30} {item['count']:8} ({item['share']:.1%})")
+        print(f"    histogram confidence: {stats['confidence_histogram']}")
+    if 'logged' in report:
+        print(f"[i] Cocok dengan intent yang tercatat: {report['logged']['agreement_with_model']:.1%} "
+              f"(JS divergence {report['logged']['js_divergence']})")
+    if 'drift' in report:
+        drift = report['drift']
+        print(f"[i] Drift {drift['from']} -> {drift['to']}: intent sama {drift['agreement']:.1%}, "
+              f"JS divergence {drift['js_divergence']}")
+        for item in drift['top_transitions'][:10]:
+            print(f"      {item['from']} -> {item['to']}: {item['count']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluasi model terhadap chat_history")
+    parser.add_argument('--model', help="versi model (default: versi aktif, 'legacy' untuk artefak lama)")
+    parser.add_argument('--compare', help="versi kedua untuk menghitung drift")
+    parser.add_argument('--since', help="awal rentang waktu (YYYY-MM-DD)")
+    parser.add_argument('--until', help="akhir rentang waktu, eksklusif (YYYY-MM-DD)")
+    parser.add_argument('--workers', type=int, help="jumlah proses (default: jumlah core)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--output', help="simpan laporan lengkap sebagai JSON")
+    args = parser.parse_args()
+
+    try:
+        report = evaluate(args.model, args.compare, args.since, args.until, args.workers, args.chunk_size)
+    except (model_registry.RegistryError, ValueError) as e:
+        print(f"[X] {e}")
+        sys.exit(1)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"[✓] Laporan disimpan ke '{args.output}'")
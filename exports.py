@@ -0,0 +1,109 @@
+import io
+import os
+import csv
+import json
+from datetime import date, datetime
+from flask import Response
+from config import get_db_connection
+
+# Baris per FETCH dari cursor server-side; satu chunk = satu potongan respons HTTP
+CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+# Rentang tanggal ?since=YYYY-MM-DD&until=YYYY-MM-DD (until eksklusif, sama dengan evaluation.py)
+def parse_date_range(args):
+    bounds = []
+    for name in ('since', 'until'):
+        value = args.get(name)
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            bounds.append(date.fromisoformat(value))
+        except ValueError:
+            raise ValueError(f"Parameter {name} harus berformat YYYY-MM-DD")
+    if bounds[0] and bounds[1] and bounds[0] >= bounds[1]:
+        raise ValueError("Parameter since harus sebelum until")
+    return tuple(bounds)
+
+# Kondisi WHERE untuk kolom waktu `column` plus filter kesamaan tambahan (nilai None dilewati)
+def build_filters(column, since=None, until=None, **equals):
+    conditions, params = [], []
+    if since:
+        conditions.append(f"{column} >= %s")
+        params.append(since)
+    if until:
+        conditions.append(f"{column} < %s")
+        params.append(until)
+    for field, value in equals.items():
+        if value is not None:
+            conditions.append(f"{field} = %s")
+            params.append(value)
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipe {type(value).__name__} tidak bisa diekspor")
+
+def _format_chunk(rows, columns, fmt, buffer, writer):
+    if fmt == 'jsonl':
+        return ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_value) + '\n'
+                       for row in rows)
+    writer.writerows(rows)
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+# Respons HTTP yang di-stream langsung dari cursor bernama (server-side): hanya satu chunk
+# berada di memori worker. Query dijalankan sebelum respons dikirim agar error masih bisa
+# dilaporkan sebagai 500; koneksi kembali ke pool saat stream selesai atau klien memutus.
+def export_response(query, params, columns, fmt, filename, chunk_size=CHUNK_SIZE):
+    conn = get_db_connection()
+    if conn is None:
+        raise RuntimeError("Koneksi database tidak tersedia")
+    try:
+        cur = conn.cursor(name=f"export_{filename}")
+        cur.execute(query, params)
+        first = cur.fetchmany(chunk_size)
+    except Exception:
+        conn.release()
+        raise
+
+    released = []
+
+    def release():
+        if released:
+            return
+        released.append(True)
+        try:
+            cur.close()
+        except Exception:
+            pass
+        finally:
+            conn.release()
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        try:
+            if fmt == 'csv':
+                writer.writerow(columns)
+            rows = first
+            while rows:
+                yield _format_chunk(rows, columns, fmt, buffer, writer)
+                rows = cur.fetchmany(chunk_size)
+            if fmt == 'csv' and buffer.tell():
+                yield _format_chunk([], columns, fmt, buffer, writer)
+        finally:
+            release()
+
+    response = Response(generate(), mimetype=FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename={filename}.{fmt}',
+        'X-Accel-Buffering': 'no',
+    })
+    # Generator yang belum sempat dijalankan tidak memanggil finally-nya
+    response.call_on_close(release)
+    return response
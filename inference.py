@@ -0,0 +1,130 @@
+import io
+import json
+import re
+import zipfile
+import h5py
+import numpy as np
+
+# Fungsi aktivasi yang dipakai oleh model hasil training.train_data
+def _relu(x):
+    return np.maximum(x, 0.0, out=x)
+
+def _softmax(x):
+    x = x - x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+def _linear(x):
+    return x
+
+ACTIVATIONS = {
+    'relu': _relu,
+    'softmax': _softmax,
+    'linear': _linear,
+}
+
+# Layer yang tidak berpengaruh saat inferensi (hanya aktif saat training)
+PASSTHROUGH_LAYERS = {'InputLayer', 'Dropout'}
+
+
+def _snake_case(name):
+    name = re.sub(r'(.)([A-Z][a-z]+)', r'\1_\2', name)
+    return re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', name).lower()
+
+
+class NumpyModel:
+    """Forward pass model Dense (Keras Sequential) memakai NumPy murni."""
+
+    def __init__(self, layers):
+        # layers: list berisi tuple (kernel, bias, nama_aktivasi)
+        self.layers = [
+            (np.ascontiguousarray(kernel, dtype=np.float32),
+             np.asarray(bias, dtype=np.float32),
+             activation)
+            for kernel, bias, activation in layers
+        ]
+        self.input_dim = self.layers[0][0].shape[0]
+        self.output_dim = self.layers[-1][0].shape[1]
+
+    @classmethod
+    def from_keras(cls, path):
+        """Ambil bobot dari file .keras tanpa mengimpor TensorFlow/Keras."""
+        with zipfile.ZipFile(path) as archive:
+            config = json.loads(archive.read('config.json'))
+            weights = archive.read('model.weights.h5')
+
+        if config.get('class_name') != 'Sequential':
+            raise ValueError(f"Model '{path}' bukan Sequential")
+
+        layers = []
+        seen = {}
+        with h5py.File(io.BytesIO(weights), 'r') as h5:
+            for layer in config['config']['layers']:
+                class_name = layer['class_name']
+                if class_name == 'InputLayer':
+                    continue
+
+                # Keras menyimpan bobot per layer dengan nama snake_case + nomor urut
+                base = _snake_case(class_name)
+                count = seen.get(base, 0)
+                seen[base] = count + 1
+                key = base if count == 0 else f"{base}_{count}"
+
+                if class_name in PASSTHROUGH_LAYERS:
+                    continue
+                if class_name != 'Dense':
+                    raise ValueError(f"Layer '{class_name}' belum didukung")
+
+                activation = layer['config'].get('activation', 'linear')
+                if activation not in ACTIVATIONS:
+                    raise ValueError(f"Aktivasi '{activation}' belum didukung")
+
+                variables = h5[f'layers/{key}/vars']
+                kernel = variables['0'][()]
+                if layer['config'].get('use_bias', True):
+                    bias = variables['1'][()]
+                else:
+                    bias = np.zeros(kernel.shape[1], dtype=np.float32)
+                layers.append((kernel, bias, activation))
+
+        if not layers:
+            raise ValueError(f"Tidak ada layer Dense di '{path}'")
+        return cls(layers)
+
+    def predict(self, x):
+        """Hitung probabilitas untuk matriks input berukuran (batch, input_dim)."""
+        out = np.asarray(x, dtype=np.float32)
+        if out.ndim == 1:
+            out = out[np.newaxis, :]
+        for kernel, bias, activation in self.layers:
+            out = out @ kernel
+            out += bias
+            out = ACTIVATIONS[activation](out)
+        return out
+
+
+# Bandingkan output NumpyModel dengan keras model.predict
+def check_parity(path='model.keras', samples=256, seed=0):
+    from keras.models import load_model
+
+    numpy_model = NumpyModel.from_keras(path)
+    keras_model = load_model(path)
+
+    rng = np.random.default_rng(seed)
+    x = (rng.random((samples, numpy_model.input_dim)) < 0.1).astype(np.float32)
+
+    expected = keras_model.predict(x, verbose=0)
+    actual = numpy_model.predict(x)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    same_top = bool(np.array_equal(expected.argmax(axis=1), actual.argmax(axis=1)))
+    return max_diff, same_top
+
+
+if __name__ == "__main__":
+    max_diff, same_top = check_parity()
+    print(f"[i] Selisih maksimum terhadap Keras: {max_diff:.2e}")
+    print(f"[i] Intent teratas identik: {same_top}")
+    if max_diff > 1e-5 or not same_top:
+        raise SystemExit("[X] Output NumpyModel tidak sama dengan Keras")
+    print("[✓] NumpyModel identik dengan Keras")
@@ -0,0 +1,316 @@
+import io
+import csv
+import json
+from psycopg2.extras import execute_values
+
+# Pola dan respon disimpan per baris di tabel anak (lihat migrasi 007 intent_children)
+CHILD_TABLES = {'patterns': 'intent_patterns', 'responses': 'intent_responses'}
+MAX_TAG_LENGTH = 1000
+
+CSV_COLUMNS = ['tag', 'type', 'text']
+
+
+class IntentImportError(ValueError):
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} kesalahan validasi")
+        self.errors = errors
+
+
+# Baca intent dari database: tag -> daftar baris (id, patterns, responses beserta id tiap teks).
+# ids membatasi pembacaan ke intent tertentu.
+def fetch_intents(cur, ids=None):
+    where = "WHERE id = ANY(%s)" if ids is not None else ""
+    params = (list(ids),) if ids is not None else ()
+    cur.execute(f"SELECT id, tag, created_at FROM data {where} ORDER BY id", params)
+    by_id = {
+        id: {'id': id, 'tag': tag, 'created_at': created_at,
+             'patterns': [], 'pattern_ids': [], 'responses': [], 'response_ids': []}
+        for id, tag, created_at in cur.fetchall()
+    }
+
+    for field, table in CHILD_TABLES.items():
+        where = "WHERE data_id = ANY(%s)" if ids is not None else ""
+        cur.execute(f"SELECT id, data_id, text FROM {table} {where} ORDER BY data_id, position, id", params)
+        ids_field = field[:-1] + '_ids'
+        for child_id, data_id, text in cur.fetchall():
+            row = by_id.get(data_id)
+            if row is not None:
+                row[field].append(text)
+                row[ids_field].append(child_id)
+
+    existing = {}
+    for row in by_id.values():
+        existing.setdefault(row['tag'], []).append(row)
+    return existing
+
+# JSONL: satu intent per baris, format sama dengan entri data.json
+def parse_jsonl(lines):
+    intents, errors = [], []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors.append(f"Baris {number}: JSON tidak valid ({e.msg})")
+            continue
+        if not isinstance(item, dict):
+            errors.append(f"Baris {number}: harus berupa objek JSON")
+            continue
+        if not isinstance(item.get('tag'), str):
+            errors.append(f"Baris {number}: tag harus berupa teks")
+            continue
+        intents.append({
+            'tag': item.get('tag'),
+            'patterns': item.get('patterns') or [],
+            'responses': item.get('responses') or [],
+            'line': number,
+        })
+    return intents, errors
+
+# CSV: satu baris per pola/respon dengan kolom tag,type,text (type = pattern | response)
+def parse_csv(lines):
+    reader = csv.DictReader(lines)
+    missing = [c for c in CSV_COLUMNS if c not in (reader.fieldnames or [])]
+    if missing:
+        return [], [f"Kolom CSV tidak ada: {', '.join(missing)}"]
+
+    intents, errors = {}, []
+    for number, row in enumerate(reader, start=2):
+        tag, kind, text = (row['tag'] or '').strip(), (row['type'] or '').strip().lower(), (row['text'] or '').strip()
+        if kind not in ('pattern', 'response'):
+            errors.append(f"Baris {number}: type harus 'pattern' atau 'response'")
+            continue
+        intent = intents.setdefault(tag, {'tag': tag, 'patterns': [], 'responses': [], 'line': number})
+        intent['patterns' if kind == 'pattern' else 'responses'].append(text)
+    return list(intents.values()), errors
+
+# Tag yang muncul lebih dari sekali digabung (training juga memperlakukannya sebagai satu kelas)
+def merge_duplicates(intents):
+    merged = {}
+    for intent in intents:
+        current = merged.get(intent.get('tag'))
+        if current is None:
+            merged[intent.get('tag')] = dict(intent)
+            continue
+        for field in ('patterns', 'responses'):
+            if isinstance(current[field], list) and isinstance(intent[field], list):
+                current[field] = current[field] + [i for i in intent[field] if i not in current[field]]
+    return list(merged.values())
+
+def validate(intents):
+    errors = []
+    for intent in intents:
+        where = f"Baris {intent.get('line', '?')}"
+        tag = intent.get('tag')
+        if tag is not None and not isinstance(tag, str):
+            errors.append(f"{where}: tag harus berupa teks")
+            continue
+        if not tag or not tag.strip():
+            errors.append(f"{where}: tag kosong")
+            continue
+        if len(tag) > MAX_TAG_LENGTH:
+            errors.append(f"{where}: tag melebihi {MAX_TAG_LENGTH} karakter")
+            continue
+
+        for field in ('patterns', 'responses'):
+            items = intent.get(field)
+            if not isinstance(items, list) or not all(isinstance(i, str) for i in items):
+                errors.append(f"{where}: {field} '{tag}' harus berupa daftar teks")
+                continue
+            items = intent[field] = [i.strip() for i in items if i.strip()]
+            if not items:
+                errors.append(f"{where}: {field} '{tag}' kosong")
+    return errors
+
+# Bandingkan dengan isi database; hanya intent yang berubah yang akan ditulis
+def diff(existing, incoming, replace=False):
+    added, changed, unchanged, removed = [], [], 0, []
+    incoming_tags = set()
+    for intent in incoming:
+        incoming_tags.add(intent['tag'])
+        rows = existing.get(intent['tag'])
+        if not rows:
+            added.append(intent)
+            continue
+        current = rows[0]
+        if current['patterns'] == intent['patterns'] and current['responses'] == intent['responses']:
+            unchanged += 1
+        else:
+            changed.append(dict(intent, id=current['id'], current=current))
+        # Baris ganda dengan tag yang sama dibersihkan saat mode replace
+        if replace:
+            removed.extend(row['id'] for row in rows[1:])
+
+    if replace:
+        for tag, rows in existing.items():
+            if tag not in incoming_tags:
+                removed.extend(row['id'] for row in rows)
+    return {'added': added, 'changed': changed, 'unchanged': unchanged, 'removed': removed}
+
+# Cocokkan daftar teks baru dengan baris anak yang ada: teks yang sama memakai baris lama
+# (hanya posisinya yang diperbarui jika bergeser), sisanya ditambah atau dihapus
+def child_changes(data_id, old_ids, old_texts, new_texts):
+    available = {}
+    for child_id, text in zip(old_ids, old_texts):
+        available.setdefault(text, []).append(child_id)
+    old_position = {child_id: i for i, child_id in enumerate(old_ids)}
+
+    inserts, moves = [], []
+    for position, text in enumerate(new_texts):
+        ids = available.get(text)
+        if ids:
+            child_id = ids.pop(0)
+            if old_position[child_id] != position:
+                moves.append((child_id, position))
+        else:
+            inserts.append((data_id, position, text))
+    deletes = [child_id for ids in available.values() for child_id in ids]
+    return inserts, moves, deletes
+
+def _copy_children(cur, table, rows):
+    # COPY: satu round trip berapa pun jumlah baris anak
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} (data_id, position, text) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def insert_intents(cur, intents):
+    ids = execute_values(cur, "INSERT INTO data (tag) VALUES %s RETURNING id",
+                         [(intent['tag'],) for intent in intents], page_size=1000, fetch=True)
+    for field, table in CHILD_TABLES.items():
+        rows = [(data_id, position, text)
+                for (data_id,), intent in zip(ids, intents)
+                for position, text in enumerate(intent[field])]
+        if rows:
+            _copy_children(cur, table, rows)
+    return [data_id for (data_id,) in ids]
+
+# Tulis perubahan intent yang sudah ada; hanya baris anak yang berbeda yang disentuh.
+# changed berisi intent baru dengan 'id' dan 'current' (baris hasil fetch_intents).
+def update_intents(cur, changed):
+    renamed = [(i['id'], i['tag']) for i in changed if i['tag'] != i['current']['tag']]
+    if renamed:
+        execute_values(cur, """
+            UPDATE data SET tag = v.tag FROM (VALUES %s) AS v (id, tag) WHERE data.id = v.id
+        """, renamed, page_size=1000)
+
+    touched = 0
+    for field, table in CHILD_TABLES.items():
+        inserts, moves, deletes = [], [], []
+        ids_field = field[:-1] + '_ids'
+        for intent in changed:
+            i, m, d = child_changes(intent['id'], intent['current'][ids_field],
+                                    intent['current'][field], intent[field])
+            inserts += i
+            moves += m
+            deletes += d
+        if deletes:
+            cur.execute(f"DELETE FROM {table} WHERE id = ANY(%s)", (deletes,))
+        if moves:
+            execute_values(cur, f"""
+                UPDATE {table} SET position = v.position
+                FROM (VALUES %s) AS v (id, position) WHERE {table}.id = v.id
+            """, moves, page_size=1000)
+        if inserts:
+            _copy_children(cur, table, inserts)
+        touched += len(inserts) + len(moves) + len(deletes)
+    return touched
+
+def apply_diff(cur, changes):
+    touched = []
+    if changes['added']:
+        touched += insert_intents(cur, changes['added'])
+    if changes['changed']:
+        update_intents(cur, changes['changed'])
+        touched += [i['id'] for i in changes['changed']]
+    if changes['removed']:
+        # Baris anak ikut terhapus (ON DELETE CASCADE)
+        cur.execute("DELETE FROM data WHERE id = ANY(%s)", (changes['removed'],))
+        touched += changes['removed']
+    record_changes(cur, touched)
+
+# Catat intent yang berubah (ditambah, diubah, atau dihapus) di log intent_changes; ikut
+# transaksi pemanggil sehingga proses lain hanya melihatnya setelah commit
+def record_changes(cur, ids):
+    if ids:
+        execute_values(cur, "INSERT INTO intent_changes (data_id) VALUES %s", [(id,) for id in ids], page_size=1000)
+
+def latest_change(cur):
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM intent_changes")
+    return cur.fetchone()[0]
+
+# Entri log setelah posisi `after`: (posisi terakhir, id intent yang berubah)
+def changes_since(cur, after):
+    cur.execute("SELECT id, data_id FROM intent_changes WHERE id > %s ORDER BY id", (after,))
+    rows = cur.fetchall()
+    if not rows:
+        return after, []
+    return rows[-1][0], list(dict.fromkeys(data_id for _, data_id in rows))
+
+# Entri sampai posisi `up_to` sudah dimuat semua versi model yang disimpan. Batas umur tetap
+# dipakai untuk proses yang masih melayani versi lama (mis. hot-swap yang gagal).
+def prune_changes(cur, up_to, max_age_hours=24):
+    cur.execute("""
+        DELETE FROM intent_changes
+        WHERE id <= %s AND changed_at < NOW() - %s * INTERVAL '1 hour'
+    """, (up_to, max_age_hours))
+    return cur.rowcount
+
+def summarize(changes):
+    return {
+        'added': [i['tag'] for i in changes['added']],
+        'changed': [i['tag'] for i in changes['changed']],
+        'removed': len(changes['removed']),
+        'unchanged': changes['unchanged'],
+    }
+
+# Impor intent dalam satu transaksi. mode 'merge' hanya menambah/mengubah; 'replace' juga
+# menghapus intent yang tidak ada di file. dry_run hanya menghitung perbedaan.
+def import_intents(conn, intents, replace=False, dry_run=False):
+    # Validasi dulu (per baris file, tag pasti teks), baru tag ganda digabung
+    errors = validate(intents)
+    if errors:
+        raise IntentImportError(errors)
+    intents = merge_duplicates(intents)
+
+    with conn.cursor() as cur:
+        # Cegah dua impor bersamaan menghitung diff dari isi tabel yang sama
+        cur.execute("LOCK TABLE data IN SHARE ROW EXCLUSIVE MODE")
+        changes = diff(fetch_intents(cur), intents, replace=replace)
+        if not dry_run:
+            apply_diff(cur, changes)
+    if dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
+    return summarize(changes)
+
+def parse(lines, fmt):
+    if fmt == 'jsonl':
+        return parse_jsonl(lines)
+    if fmt == 'csv':
+        return parse_csv(lines)
+    raise ValueError(f"Format '{fmt}' tidak didukung (jsonl atau csv)")
+
+# Ekspor hasil fetch_intents per baris agar bisa di-stream ke respons HTTP atau file
+def export_lines(existing, fmt):
+    intents = [row for rows in existing.values() for row in rows]
+
+    if fmt == 'jsonl':
+        for intent in intents:
+            yield json.dumps({'tag': intent['tag'], 'patterns': intent['patterns'],
+                              'responses': intent['responses']}, ensure_ascii=False) + '\n'
+    elif fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        yield ','.join(CSV_COLUMNS) + '\r\n'
+        for intent in intents:
+            writer.writerows([intent['tag'], 'pattern', p] for p in intent['patterns'])
+            writer.writerows([intent['tag'], 'response', r] for r in intent['responses'])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    else:
+        raise ValueError(f"Format '{fmt}' tidak didukung (jsonl atau csv)")
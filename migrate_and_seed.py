@@ -1,73 +1,16 @@
 import psycopg2
 from flask_bcrypt import Bcrypt
 from config import get_db_connection
+from migrations import migrate
+from intent_store import import_intents, IntentImportError
 import json
 
 bcrypt = Bcrypt()
 
+# Skema dikelola oleh migrations.py (versi tercatat di tabel schema_migrations)
 def create_tables():
-    queries = [
-        """
-        CREATE TABLE IF NOT EXISTS public.users (
-            id SERIAL PRIMARY KEY,
-            email VARCHAR(100) UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            role VARCHAR(10) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """,
-
-        """
-        CREATE TABLE IF NOT EXISTS public.antrian_ktp (
-            id SERIAL PRIMARY KEY,
-            user_id VARCHAR(50) NOT NULL,
-            nama VARCHAR(100) NOT NULL,
-            email VARCHAR(100) NOT NULL,
-            nomor_antrian INTEGER NOT NULL,
-            status VARCHAR(20) DEFAULT 'Menunggu',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """,
-
-        """
-        CREATE TABLE IF NOT EXISTS public.chat_history (
-            id SERIAL PRIMARY KEY,
-            user_id VARCHAR(50) NOT NULL,
-            message TEXT NOT NULL,
-            response TEXT NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """,
-
-        """
-        CREATE TABLE IF NOT EXISTS public.pengaduan (
-            id SERIAL PRIMARY KEY,
-            user_id VARCHAR(50) NOT NULL,
-            nama VARCHAR(100) NOT NULL,
-            email VARCHAR(100) NOT NULL,
-            kategori VARCHAR(50) NOT NULL,
-            isi_pengaduan TEXT NOT NULL,
-            status VARCHAR(20) DEFAULT 'Pending',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """,
-        """
-        CREATE TABLE IF NOT EXISTS public.data (
-            id SERIAL PRIMARY KEY,
-            tag VARCHAR(1000) NOT NULL,
-            patterns VARCHAR(1000) NOT NULL,
-            responses VARCHAR(1000) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-    ]
-
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cursor:
-                for query in queries:
-                    cursor.execute(query)
-            conn.commit()
+        migrate()
         print("Tabel berhasil dibuat atau sudah ada.")
     except psycopg2.Error as e:
         print(f"Error saat membuat tabel: {e}")
@@ -91,29 +34,21 @@ def seed_admin():
     except psycopg2.Error as e:
         print(f"Error saat menambahkan admin: {e}")
         
+# Isi tabel data dari data.json; hanya intent yang berbeda yang ditulis (lihat intent_store)
 def seed_data_from_json(json_path):
     try:
         with open(json_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
 
         with get_db_connection() as conn:
-            with conn.cursor() as cursor:
-                # Kosongkan dulu isi tabel
-                cursor.execute("DELETE FROM data")
-
-                for item in data['intents']:
-                    tag = item['tag']
-                    patterns = "|".join(item['patterns'])[:1000]  # pastikan tidak melebihi kolom varchar
-                    responses = "|".join(item['responses'])[:1000]
-
-                    cursor.execute("""
-                        INSERT INTO data (tag, patterns, responses)
-                        VALUES (%s, %s, %s)
-                    """, (tag, patterns, responses))
+            summary = import_intents(conn, data['intents'], replace=True)
 
-                conn.commit()
-                print("Data berhasil di-seed dari data.json ke tabel 'data'.")
+        print("Data berhasil di-seed dari data.json ke tabel 'data' "
+              f"({len(summary['added'])} baru, {len(summary['changed'])} diubah, "
+              f"{summary['removed']} dihapus, {summary['unchanged']} tetap).")
 
+    except IntentImportError as e:
+        print(f"Error saat melakukan seed data: {'; '.join(e.errors)}")
     except (psycopg2.Error, FileNotFoundError, json.JSONDecodeError) as e:
         print(f"Error saat melakukan seed data: {e}")
 
@@ -0,0 +1,420 @@
+import sys
+import json
+from config import get_db_connection
+
+# Kunci advisory agar dua proses tidak menjalankan migrasi bersamaan
+MIGRATION_LOCK_KEY = 720302
+
+# Daftar migrasi berurutan: (versi, nama, daftar SQL). Versi yang sudah tercatat di
+# schema_migrations tidak dijalankan lagi; setiap migrasi berjalan dalam satu transaksi.
+# Perintah memakai IF NOT EXISTS agar database lama yang dibuat dengan DDL ad-hoc ikut aman.
+MIGRATIONS = [
+    (1, 'initial_schema', [
+        """
+        CREATE TABLE IF NOT EXISTS public.users (
+            id SERIAL PRIMARY KEY,
+            email VARCHAR(100) UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role VARCHAR(10) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS public.antrian_ktp (
+            id SERIAL PRIMARY KEY,
+            user_id VARCHAR(50) NOT NULL,
+            nama VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL,
+            nomor_antrian INTEGER NOT NULL,
+            status VARCHAR(20) DEFAULT 'Menunggu',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS public.chat_history (
+            id SERIAL PRIMARY KEY,
+            user_id VARCHAR(50) NOT NULL,
+            message TEXT NOT NULL,
+            response TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS public.pengaduan (
+            id SERIAL PRIMARY KEY,
+            user_id VARCHAR(50) NOT NULL,
+            nama VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL,
+            kategori VARCHAR(50) NOT NULL,
+            isi_pengaduan TEXT NOT NULL,
+            status VARCHAR(20) DEFAULT 'Pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS public.data (
+            id SERIAL PRIMARY KEY,
+            tag VARCHAR(1000) NOT NULL,
+            patterns VARCHAR(1000) NOT NULL,
+            responses VARCHAR(1000) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+
+    (2, 'training_jobs', [
+        """
+        CREATE TABLE IF NOT EXISTS public.training_jobs (
+            id SERIAL PRIMARY KEY,
+            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+            reason VARCHAR(500),
+            progress REAL DEFAULT 0,
+            epoch INTEGER,
+            total_epochs INTEGER,
+            message TEXT,
+            requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        """,
+        # Paling banyak satu job berstatus 'queued' agar edit beruntun digabung
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS training_jobs_one_queued
+        ON public.training_jobs ((status)) WHERE status = 'queued'
+        """,
+    ]),
+
+    (3, 'chat_history_intent', [
+        # Intent dan confidence dicatat server saat menjawab /get
+        "ALTER TABLE public.chat_history ADD COLUMN IF NOT EXISTS intent VARCHAR(100)",
+        "ALTER TABLE public.chat_history ADD COLUMN IF NOT EXISTS confidence REAL",
+    ]),
+
+    (4, 'email_outbox', [
+        """
+        CREATE TABLE IF NOT EXISTS public.email_outbox (
+            id SERIAL PRIMARY KEY,
+            recipient VARCHAR(100) NOT NULL,
+            subject VARCHAR(255) NOT NULL,
+            body TEXT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            locked_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+        """,
+        # Email yang belum terkirim dicari berdasarkan jadwal percobaan berikutnya
+        """
+        CREATE INDEX IF NOT EXISTS email_outbox_due
+        ON public.email_outbox (next_attempt_at) WHERE status IN ('pending', 'sending')
+        """,
+    ]),
+
+    (5, 'antrian_counter', [
+        # Counter nomor tiket antrian per hari
+        """
+        CREATE TABLE IF NOT EXISTS public.antrian_counter (
+            tanggal DATE PRIMARY KEY,
+            last_number INTEGER NOT NULL
+        )
+        """,
+        # Tiket antrian bernomor per tanggal; baris lama diisi dari created_at
+        "ALTER TABLE public.antrian_ktp ADD COLUMN IF NOT EXISTS tanggal DATE",
+        "UPDATE public.antrian_ktp SET tanggal = COALESCE(created_at::date, CURRENT_DATE) WHERE tanggal IS NULL",
+        "ALTER TABLE public.antrian_ktp ALTER COLUMN tanggal SET DEFAULT CURRENT_DATE",
+        """
+        INSERT INTO public.antrian_counter (tanggal, last_number)
+        SELECT tanggal, MAX(nomor_antrian) FROM public.antrian_ktp GROUP BY tanggal
+        ON CONFLICT (tanggal) DO NOTHING
+        """,
+        # Posisi antrian dihitung dari urutan tiket yang masih menunggu
+        """
+        CREATE INDEX IF NOT EXISTS antrian_ktp_status_tiket
+        ON public.antrian_ktp (status, tanggal, nomor_antrian)
+        """,
+    ]),
+
+    # user_id VARCHAR diganti kolom INTEGER ber-FK ke users(id). Nilai lama disimpan di
+    # user_id_legacy; baris yang user-nya sudah tidak ada mendapat user_id NULL.
+    (6, 'typed_user_fks', [
+        "DROP INDEX IF EXISTS public.chat_history_user_ts_id",
+    ] + [
+        statement
+        for table, on_delete in [('chat_history', 'CASCADE'), ('antrian_ktp', 'SET NULL'), ('pengaduan', 'SET NULL')]
+        for statement in [
+            f"ALTER TABLE public.{table} RENAME COLUMN user_id TO user_id_legacy",
+            f"ALTER TABLE public.{table} ALTER COLUMN user_id_legacy DROP NOT NULL",
+            f"ALTER TABLE public.{table} ADD COLUMN user_id INTEGER REFERENCES public.users (id) ON DELETE {on_delete}",
+            f"""
+            UPDATE public.{table} t SET user_id = u.id
+            FROM public.users u
+            WHERE t.user_id_legacy = u.id::text
+            """,
+        ]
+    ] + [
+        # Riwayat chat per user (halaman terbaru lebih dulu + pesan terakhir per user)
+        """
+        CREATE INDEX IF NOT EXISTS chat_history_user_ts_id
+        ON public.chat_history (user_id, timestamp, id)
+        """,
+        # Daftar pengaduan per status, terbaru lebih dulu
+        """
+        CREATE INDEX IF NOT EXISTS pengaduan_status_created
+        ON public.pengaduan (status, created_at)
+        """,
+    ]),
+
+    # Pola dan respon dipindah dari string '|' (VARCHAR 1000) ke tabel anak, satu baris per
+    # teks dengan id sendiri agar perubahan bisa ditulis per baris
+    (7, 'intent_children', [
+        statement
+        for table, column in [('intent_patterns', 'patterns'), ('intent_responses', 'responses')]
+        for statement in [
+            f"""
+            CREATE TABLE IF NOT EXISTS public.{table} (
+                id SERIAL PRIMARY KEY,
+                data_id INTEGER NOT NULL REFERENCES public.data (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL
+            )
+            """,
+            f"""
+            CREATE INDEX IF NOT EXISTS {table}_data_position
+            ON public.{table} (data_id, position)
+            """,
+            f"""
+            INSERT INTO public.{table} (data_id, position, text)
+            SELECT d.id, t.ord - 1, t.text
+            FROM public.data d
+            CROSS JOIN LATERAL unnest(string_to_array(d.{column}, '|')) WITH ORDINALITY AS t (text, ord)
+            WHERE t.text <> ''
+            """,
+            f"ALTER TABLE public.data DROP COLUMN IF EXISTS {column}",
+        ]
+    ]),
+
+    # Log perubahan intent; setiap proses server membaca entri baru untuk memperbarui
+    # indeks pencarian pola tanpa menunggu training ulang
+    (8, 'intent_changes', [
+        """
+        CREATE TABLE IF NOT EXISTS public.intent_changes (
+            id BIGSERIAL PRIMARY KEY,
+            data_id INTEGER NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+
+    # Riwayat chat selalu milik user (FK ON DELETE CASCADE), jadi user_id tidak boleh NULL.
+    # Baris yatim dari migrasi 006 (user lama sudah tidak ada) dipindah ke chat_history_orphans.
+    (9, 'chat_history_user_not_null', [
+        """
+        CREATE TABLE IF NOT EXISTS public.chat_history_orphans
+        (LIKE public.chat_history INCLUDING DEFAULTS)
+        """,
+        """
+        WITH moved AS (
+            DELETE FROM public.chat_history WHERE user_id IS NULL RETURNING *
+        )
+        INSERT INTO public.chat_history_orphans SELECT * FROM moved
+        """,
+        "ALTER TABLE public.chat_history ALTER COLUMN user_id SET NOT NULL",
+    ]),
+
+    # Kolom intent chat_history selebar data.tag (intent_store.MAX_TAG_LENGTH)
+    (10, 'chat_history_intent_width', [
+        "ALTER TABLE public.chat_history ALTER COLUMN intent TYPE VARCHAR(1000)",
+        "ALTER TABLE public.chat_history_orphans ALTER COLUMN intent TYPE VARCHAR(1000)",
+    ]),
+
+    # Pesan terakhir per user untuk daftar riwayat admin, dijaga trigger chat_history. Halaman
+    # daftar cukup membaca index (timestamp, user_id) tanpa mencari pesan terakhir semua user.
+    (11, 'chat_last_message', [
+        """
+        CREATE TABLE IF NOT EXISTS public.chat_last_message (
+            user_id INTEGER PRIMARY KEY REFERENCES public.users(id) ON DELETE CASCADE,
+            chat_id INTEGER NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            message TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS chat_last_message_ts_user
+        ON public.chat_last_message (timestamp, user_id)
+        """,
+        """
+        CREATE OR REPLACE FUNCTION public.chat_last_message_insert() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO public.chat_last_message AS last (user_id, chat_id, timestamp, message)
+            SELECT DISTINCT ON (user_id) user_id, id, timestamp, message
+            FROM new_rows
+            WHERE timestamp IS NOT NULL
+            ORDER BY user_id, timestamp DESC, id DESC
+            ON CONFLICT (user_id) DO UPDATE
+            SET chat_id = EXCLUDED.chat_id, timestamp = EXCLUDED.timestamp, message = EXCLUDED.message
+            WHERE (EXCLUDED.timestamp, EXCLUDED.chat_id) > (last.timestamp, last.chat_id);
+            RETURN NULL;
+        END
+        $$
+        """,
+        # Chat yang dihapus: pesan terakhir user yang terkena dihitung ulang
+        """
+        CREATE OR REPLACE FUNCTION public.chat_last_message_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            DELETE FROM public.chat_last_message last
+            USING old_rows WHERE last.chat_id = old_rows.id;
+            INSERT INTO public.chat_last_message (user_id, chat_id, timestamp, message)
+            SELECT DISTINCT ON (ch.user_id) ch.user_id, ch.id, ch.timestamp, ch.message
+            FROM public.chat_history ch
+            WHERE ch.user_id IN (SELECT user_id FROM old_rows) AND ch.timestamp IS NOT NULL
+            ORDER BY ch.user_id, ch.timestamp DESC, ch.id DESC
+            ON CONFLICT (user_id) DO NOTHING;
+            RETURN NULL;
+        END
+        $$
+        """,
+        "DROP TRIGGER IF EXISTS chat_last_message_insert ON public.chat_history",
+        """
+        CREATE TRIGGER chat_last_message_insert AFTER INSERT ON public.chat_history
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION public.chat_last_message_insert()
+        """,
+        "DROP TRIGGER IF EXISTS chat_last_message_delete ON public.chat_history",
+        """
+        CREATE TRIGGER chat_last_message_delete AFTER DELETE ON public.chat_history
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION public.chat_last_message_delete()
+        """,
+        """
+        INSERT INTO public.chat_last_message (user_id, chat_id, timestamp, message)
+        SELECT DISTINCT ON (user_id) user_id, id, timestamp, message
+        FROM public.chat_history
+        WHERE timestamp IS NOT NULL
+        ORDER BY user_id, timestamp DESC, id DESC
+        ON CONFLICT (user_id) DO NOTHING
+        """,
+    ]),
+]
+
+def _ensure_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS public.schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def applied_versions(cur):
+    _ensure_table(cur)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+# Jalankan migrasi yang belum tercatat; mengembalikan daftar versi yang baru diterapkan
+def migrate():
+    applied = []
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+            try:
+                done = applied_versions(cur)
+                conn.commit()
+                for version, name, statements in MIGRATIONS:
+                    if version in done:
+                        continue
+                    try:
+                        for statement in statements:
+                            cur.execute(statement)
+                        cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    applied.append(version)
+                    print(f"[✓] Migrasi {version:03d} {name} diterapkan")
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+                conn.commit()
+    return applied
+
+def status():
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            done = applied_versions(cur)
+    return [(version, name, version in done) for version, name, _ in MIGRATIONS]
+
+
+# Query yang paling sering dijalankan beserta index yang seharusnya dipakai
+HOT_QUERIES = [
+    ('riwayat chat user', 'chat_history_user_ts_id', """
+        SELECT id, message, response, timestamp FROM chat_history
+        WHERE user_id = %s ORDER BY timestamp DESC, id DESC LIMIT 21
+    """, (1,)),
+    ('pesan terakhir per user', 'chat_last_message_ts_user', """
+        SELECT user_id, timestamp, message FROM chat_last_message
+        WHERE (timestamp, user_id) < (NOW(), 0) ORDER BY timestamp DESC, user_id DESC LIMIT 26
+    """, ()),
+    ('pengaduan per status', 'pengaduan_status_created', """
+        SELECT id, nama, status, created_at FROM pengaduan
+        WHERE status = %s ORDER BY created_at DESC LIMIT 50
+    """, ('Pending',)),
+    ('antrian menunggu', 'antrian_ktp_status_tiket', """
+        SELECT id, nomor_antrian FROM antrian_ktp
+        WHERE status = 'Menunggu' ORDER BY tanggal, nomor_antrian
+    """, ()),
+    ('pola per intent', 'intent_patterns_data_position', """
+        SELECT id, text FROM intent_patterns WHERE data_id = %s ORDER BY position
+    """, (1,)),
+    ('login per email', 'users_email_key', """
+        SELECT id, email, password, role FROM users WHERE email = %s
+    """, ('admin1@example.com',)),
+]
+
+def _index_names(plan):
+    names = set()
+    if 'Index Name' in plan:
+        names.add(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        names |= _index_names(child)
+    return names
+
+# Cek dengan EXPLAIN bahwa setiap query panas bisa memakai index-nya. Seq scan dimatikan
+# agar hasilnya tidak bergantung pada ukuran tabel (tabel kecil selalu lebih murah di-scan).
+def check_indexes():
+    results = []
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+            for label, index, query, params in HOT_QUERIES:
+                cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+                plan = cur.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                used = _index_names(plan[0]['Plan'])
+                results.append((label, index, index in used, sorted(used)))
+            conn.rollback()
+    return results
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'migrate'
+    if command == 'migrate':
+        applied = migrate()
+        print(f"[✓] Skema terbaru ({len(applied)} migrasi baru)")
+    elif command == 'status':
+        for version, name, done in status():
+            print(f"{'*' if done else ' '} {version:03d} {name}")
+    elif command == 'check':
+        failed = False
+        for label, index, ok, used in check_indexes():
+            print(f"[{'✓' if ok else 'X'}] {label}: {index} ({', '.join(used) or 'tanpa index'})")
+            failed = failed or not ok
+        if failed:
+            raise SystemExit(1)
+    else:
+        print("Penggunaan: python migrations.py [migrate | status | check]")
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import secrets
+import time
+from datetime import datetime
+
+# Setiap hasil training disimpan di models/<versi>/, versi aktif ditunjuk oleh models/CURRENT
+REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', 'models')
+POINTER_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+ARTIFACTS = ['model.keras', 'texts.pkl', 'labels.pkl', 'data.json']
+KEEP_VERSIONS = int(os.getenv('MODEL_KEEP_VERSIONS', 5))
+
+
+class RegistryError(Exception):
+    pass
+
+
+def pointer_path(registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, POINTER_FILE)
+
+def version_dir(version, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, version)
+
+def artifact_paths(version, registry_dir=REGISTRY_DIR):
+    return {name: os.path.join(registry_dir, version, name) for name in ARTIFACTS}
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Hash stabil untuk struktur data JSON (dipakai untuk mendeteksi perubahan input training)
+def hash_json(value):
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def _fsync_dir(path):
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+# Tulis file lalu ganti dengan os.replace agar pembaca tidak pernah melihat isi setengah jadi
+def _atomic_write(path, text):
+    tmp = f"{path}.{secrets.token_hex(4)}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(path) or '.')
+
+def current_version(registry_dir=REGISTRY_DIR):
+    try:
+        with open(pointer_path(registry_dir), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(registry_dir)
+        if not name.startswith('.') and os.path.isfile(os.path.join(registry_dir, name, MANIFEST_FILE))
+    )
+
+def load_manifest(version, registry_dir=REGISTRY_DIR):
+    path = os.path.join(registry_dir, version, MANIFEST_FILE)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise RegistryError(f"Versi model '{version}' tidak ditemukan")
+
+# Cocokkan checksum semua artefak dengan manifest
+def verify(version, registry_dir=REGISTRY_DIR):
+    manifest = load_manifest(version, registry_dir)
+    for name, expected in manifest['files'].items():
+        path = os.path.join(registry_dir, version, name)
+        if not os.path.exists(path):
+            raise RegistryError(f"Artefak '{name}' hilang dari versi '{version}'")
+        if _sha256(path) != expected['sha256']:
+            raise RegistryError(f"Checksum '{name}' pada versi '{version}' tidak cocok")
+    return manifest
+
+# Direktori sementara untuk menulis artefak hasil training sebelum dipublikasikan
+def create_staging(registry_dir=REGISTRY_DIR):
+    os.makedirs(registry_dir, exist_ok=True)
+    path = os.path.join(registry_dir, f".staging-{secrets.token_hex(4)}")
+    os.makedirs(path)
+    return path
+
+def publish(staging_dir, metadata=None, registry_dir=REGISTRY_DIR, activate_version=True):
+    missing = [name for name in ARTIFACTS if not os.path.exists(os.path.join(staging_dir, name))]
+    if missing:
+        raise RegistryError(f"Artefak belum lengkap: {', '.join(missing)}")
+
+    version = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{secrets.token_hex(2)}"
+    files = {
+        name: {'sha256': _sha256(os.path.join(staging_dir, name)),
+               'size': os.path.getsize(os.path.join(staging_dir, name))}
+        for name in sorted(os.listdir(staging_dir))
+    }
+    manifest = {
+        'version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'files': files,
+        'metadata': metadata or {},
+    }
+    _atomic_write(os.path.join(staging_dir, MANIFEST_FILE), json.dumps(manifest, indent=2, ensure_ascii=False))
+
+    os.rename(staging_dir, version_dir(version, registry_dir))
+    _fsync_dir(registry_dir)
+
+    if activate_version:
+        activate(version, registry_dir)
+    prune(registry_dir=registry_dir)
+    return version
+
+def activate(version, registry_dir=REGISTRY_DIR):
+    verify(version, registry_dir)
+    _atomic_write(pointer_path(registry_dir), version + '\n')
+    return version
+
+# Kembali ke versi tertentu, atau ke versi sebelum versi aktif
+def rollback(version=None, registry_dir=REGISTRY_DIR):
+    if version is None:
+        versions = list_versions(registry_dir)
+        current = current_version(registry_dir)
+        older = [v for v in versions if current is None or v < current]
+        if not older:
+            raise RegistryError("Tidak ada versi model sebelumnya")
+        version = older[-1]
+    return activate(version, registry_dir)
+
+# Posisi log intent_changes terlama di antara versi yang masih disimpan: versi mana pun bisa
+# diaktifkan lagi (rollback) dan membutuhkan semua entri setelah posisinya. None jika tidak ada.
+def oldest_change_id(registry_dir=REGISTRY_DIR):
+    positions = []
+    for version in list_versions(registry_dir):
+        try:
+            position = load_manifest(version, registry_dir).get('metadata', {}).get('intent_change_id')
+        except (RegistryError, ValueError):
+            continue
+        if position is not None:
+            positions.append(position)
+    return min(positions) if positions else None
+
+# Hapus versi lama (versi aktif tidak pernah dihapus) dan sisa staging dari training yang gagal
+def prune(keep=KEEP_VERSIONS, registry_dir=REGISTRY_DIR, staging_max_age=86400):
+    versions = list_versions(registry_dir)
+    current = current_version(registry_dir)
+    for version in versions[:-keep] if keep > 0 else []:
+        if version != current:
+            shutil.rmtree(version_dir(version, registry_dir), ignore_errors=True)
+
+    for name in os.listdir(registry_dir):
+        path = os.path.join(registry_dir, name)
+        if name.startswith('.staging-') and time.time() - os.path.getmtime(path) > staging_max_age:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'list':
+        active = current_version()
+        for v in list_versions():
+            print(f"{'*' if v == active else ' '} {v}")
+    elif command == 'rollback':
+        print(f"[✓] Versi aktif: {rollback(sys.argv[2] if len(sys.argv) > 2 else None)}")
+    elif command == 'activate' and len(sys.argv) > 2:
+        print(f"[✓] Versi aktif: {activate(sys.argv[2])}")
+    else:
+        print("Penggunaan: python model_registry.py [list | rollback [versi] | activate <versi>]")
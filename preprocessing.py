@@ -0,0 +1,140 @@
+import os
+import re
+import threading
+from functools import lru_cache
+
+# Token = huruf/angka, boleh bersambung tanda hubung (mis. "e-ktp"); angka dipertahankan
+# karena pilihan menu ("1".."6") juga merupakan pola intent
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:-[^\W_]+)*")
+TOKENIZER_VERSION = 'regex-v1'
+
+CACHE_SIZE = int(os.getenv('PREPROCESS_CACHE_SIZE', 50000))
+
+# Singkatan dan kata tidak baku yang sering dipakai warga; nilai kosong = kata pengisi dibuang
+SLANG_WORDS = {
+    'yg': 'yang', 'utk': 'untuk', 'dgn': 'dengan', 'dg': 'dengan', 'krn': 'karena',
+    'tdk': 'tidak', 'gak': 'tidak', 'ga': 'tidak', 'gk': 'tidak', 'nggak': 'tidak', 'enggak': 'tidak',
+    'sy': 'saya', 'aku': 'saya', 'gw': 'saya', 'gue': 'saya',
+    'gmn': 'bagaimana', 'gimana': 'bagaimana', 'bgmn': 'bagaimana', 'gmna': 'bagaimana',
+    'dmn': 'dimana', 'kpn': 'kapan', 'brp': 'berapa', 'bs': 'bisa', 'bsa': 'bisa',
+    'sdh': 'sudah', 'udh': 'sudah', 'udah': 'sudah', 'blm': 'belum', 'jg': 'juga', 'aja': 'saja',
+    'pgn': 'ingin', 'pengen': 'ingin', 'pingin': 'ingin', 'mo': 'mau',
+    'makasih': 'terima kasih', 'mksh': 'terima kasih', 'trims': 'terima kasih', 'thx': 'terima kasih',
+    'ektp': 'e-ktp', 'kec': 'kecamatan', 'ket': 'keterangan',
+    'dong': '', 'deh': '', 'sih': '', 'nih': '', 'kok': '',
+}
+
+# Kata tanya dengan partikel -kah ("apakah" -> "apa")
+QUESTION_WORDS = {'apa', 'bagaimana', 'siapa', 'dimana', 'kapan', 'berapa', 'bisa', 'mana', 'mengapa', 'kenapa'}
+# Kata dasar yang kebetulan berakhiran -nya
+NYA_EXCEPTIONS = {'tanya', 'bertanya', 'ditanya', 'punya', 'hanya', 'sanya'}
+
+
+# Stemmer ringan: hanya membuang partikel/posesif yang aman tanpa kamus ("sktmnya" -> "sktm")
+def light_stem(token):
+    if token.endswith('kah') and token[:-3] in QUESTION_WORDS:
+        return token[:-3]
+    if token.endswith('nya') and len(token) - 3 >= 3 and token not in NYA_EXCEPTIONS:
+        return token[:-3]
+    return token
+
+def _sastrawi_stemmer():
+    from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+    return StemmerFactory().create_stemmer().stem
+
+# Lemmatizer WordNet (bahasa Inggris) dipakai model lama yang dilatih sebelum modul ini ada
+def _wordnet_stemmer():
+    import nltk
+    try:
+        nltk.data.find('corpora/wordnet')
+    except LookupError:
+        if os.getenv('NLTK_AUTO_DOWNLOAD', '0') != '1' or not nltk.download('wordnet', quiet=True):
+            raise
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer().lemmatize
+
+STEMMERS = {
+    'none': lambda: None,
+    'light': lambda: light_stem,
+    'sastrawi': _sastrawi_stemmer,
+    'wordnet': _wordnet_stemmer,
+}
+
+NORMALIZERS = {
+    'none': {},
+    'slang': SLANG_WORDS,
+}
+
+DEFAULT_CONFIG = {
+    'tokenizer': TOKENIZER_VERSION,
+    'normalizer': os.getenv('PREPROCESS_NORMALIZER', 'slang'),
+    'stemmer': os.getenv('PREPROCESS_STEMMER', 'light'),
+}
+
+# Model yang manifest-nya belum mencatat konfigurasi preprocessing
+LEGACY_CONFIG = {'tokenizer': TOKENIZER_VERSION, 'normalizer': 'none', 'stemmer': 'wordnet'}
+
+
+class Preprocessor:
+    """Tokenisasi + normalisasi teks yang sama untuk training dan serving, dengan cache per token."""
+
+    def __init__(self, normalizer='slang', stemmer='light', cache_size=CACHE_SIZE):
+        self.normalizer = normalizer
+        self.words = NORMALIZERS[normalizer]
+
+        try:
+            self.stem = STEMMERS[stemmer]()
+            self.stemmer = stemmer
+        except (ImportError, LookupError) as e:
+            fallback = 'none' if stemmer == 'wordnet' else 'light'
+            reason = 'resource NLTK tidak ditemukan' if isinstance(e, LookupError) else e
+            print(f"[!] Stemmer '{stemmer}' tidak tersedia ({reason}), memakai '{fallback}'")
+            self.stem = STEMMERS[fallback]()
+            self.stemmer = fallback
+
+        # Normalisasi per token di-memo; kosakata nyata jauh lebih kecil dari batas cache
+        self._normalize_token = lru_cache(maxsize=cache_size)(self._normalize_token_uncached)
+
+    @classmethod
+    def from_config(cls, config):
+        config = config or LEGACY_CONFIG
+        return cls(normalizer=config.get('normalizer', 'none'), stemmer=config.get('stemmer', 'none'))
+
+    @property
+    def config(self):
+        return {'tokenizer': TOKENIZER_VERSION, 'normalizer': self.normalizer, 'stemmer': self.stemmer}
+
+    def _normalize_token_uncached(self, token):
+        replacement = self.words.get(token)
+        parts = (token,) if replacement is None else replacement.split()
+        if self.stem is not None:
+            parts = [self.stem(part) for part in parts]
+        return tuple(part for part in parts if part)
+
+    def tokens(self, text):
+        normalize = self._normalize_token
+        result = []
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            result.extend(normalize(token))
+        return result
+
+    def cache_info(self):
+        info = self._normalize_token.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
+
+
+_instances = {}
+_lock = threading.Lock()
+
+# Satu instance per konfigurasi agar cache dipakai bersama oleh semua versi model yang sama
+def get_preprocessor(config=None):
+    config = config or LEGACY_CONFIG
+    key = (config.get('tokenizer'), config.get('normalizer'), config.get('stemmer'))
+    with _lock:
+        instance = _instances.get(key)
+        if instance is None:
+            instance = _instances[key] = Preprocessor.from_config(config)
+    return instance
+
+def default_preprocessor():
+    return get_preprocessor(DEFAULT_CONFIG)
@@ -0,0 +1,152 @@
+import os
+import json
+import queue
+import select
+import threading
+import time
+import psycopg2
+import psycopg2.extensions
+from config import DATABASE_CONFIG, get_db_connection
+
+CHANNEL = 'antrian_changed'
+
+# Tandai bahwa antrian berubah; NOTIFY baru terkirim saat transaksi pemanggil di-commit
+def notify_change(cur):
+    cur.execute(f"NOTIFY {CHANNEL}")
+
+
+class QueueBroker:
+    """Fan-out perubahan antrian ke semua koneksi SSE: satu pembacaan database per perubahan, per proses."""
+
+    def __init__(self, channel=CHANNEL, reconnect_delay=5.0):
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._snapshot = None
+        self._version = 0
+        self._thread = None
+        self._pid = None
+        self._stats = {'reads': 0, 'notifications': 0, 'published': 0}
+
+    def _ensure_listener(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._subscribers = set()
+                self._snapshot = None
+                self._thread = threading.Thread(target=self._listen, name='antrian-listener', daemon=True)
+                self._thread.start()
+
+    # Koneksi LISTEN khusus (di luar pool karena dipegang selama proses hidup)
+    def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(**DATABASE_CONFIG)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {self.channel}")
+                # Perubahan selama koneksi terputus tidak terlihat, jadi muat ulang sekali
+                self.refresh()
+
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if not conn.notifies:
+                        continue
+                    # Beberapa NOTIFY yang datang bersamaan cukup dilayani satu pembacaan
+                    with self._lock:
+                        self._stats['notifications'] += len(conn.notifies)
+                    conn.notifies.clear()
+                    self.refresh()
+            except Exception as e:
+                print(f"[X] Listener antrian terputus: {e}")
+            finally:
+                if conn is not None:
+                    conn.close()
+            time.sleep(self.reconnect_delay)
+
+    def _load(self):
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT id, user_id, nama, email, nomor_antrian,
+                           ROW_NUMBER() OVER (ORDER BY tanggal, nomor_antrian) AS posisi
+                    FROM antrian_ktp
+                    WHERE status = 'Menunggu'
+                    ORDER BY tanggal, nomor_antrian
+                """)
+                rows = cur.fetchall()
+        return [
+            {'id': r[0], 'user_id': r[1], 'nama': r[2], 'email': r[3], 'nomor_antrian': r[4], 'posisi': r[5]}
+            for r in rows
+        ]
+
+    # Baca antrian sekali lalu kirim ke semua pelanggan; tanpa pelanggan cukup tandai snapshot basi
+    def refresh(self):
+        with self._lock:
+            if not self._subscribers:
+                self._snapshot = None
+                return
+        waiting = self._load()
+        with self._lock:
+            self._stats['reads'] += 1
+            self._version += 1
+            self._snapshot = (self._version, waiting)
+            for q in self._subscribers:
+                self._offer(q, self._snapshot)
+                self._stats['published'] += 1
+
+    # Pelanggan hanya butuh snapshot terbaru; snapshot lama yang belum terkirim dibuang
+    @staticmethod
+    def _offer(q, snapshot):
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(snapshot)
+
+    def subscribe(self):
+        self._ensure_listener()
+        q = queue.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers.add(q)
+            snapshot = self._snapshot
+        if snapshot is not None:
+            with self._lock:
+                self._offer(q, snapshot)
+        else:
+            self.refresh()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['subscribers'] = len(self._subscribers)
+            stats['version'] = self._version
+        return stats
+
+
+# Tampilan per pelanggan dibentuk dari snapshot bersama, tanpa query tambahan
+def admin_view(waiting):
+    return {'total': len(waiting), 'antrian': waiting}
+
+def user_view(waiting, user_id):
+    return {
+        'tiket': [{'nomor_antrian': a['nomor_antrian'], 'posisi': a['posisi']}
+                  for a in waiting if a['user_id'] == user_id],
+    }
+
+def format_event(version, payload):
+    return f"id: {version}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+broker = QueueBroker()
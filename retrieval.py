@@ -0,0 +1,156 @@
+import os
+import numpy as np
+import scipy.sparse as sp
+
+RETRIEVER_FILE = 'retriever.npz'
+
+
+class TfidfRetriever:
+    """Indeks TF-IDF semua pola intent; satu perkalian matriks sparse-vektor per pertanyaan."""
+
+    def __init__(self, terms, doc_tags, doc_ids, counts, responses=None, removed_tags=()):
+        self.terms = list(terms)
+        self.term_index = {t: i for i, t in enumerate(self.terms)}
+        self.doc_tags = np.asarray(doc_tags, dtype=str)
+        # id intent (data.id) pemilik setiap pola; -1 jika tidak diketahui (data.json lama)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self.counts = sp.csr_matrix(counts, shape=(len(self.doc_tags), len(self.terms)), dtype=np.float32)
+        # Respon intent yang diubah setelah model dilatih
+        self.responses = dict(responses or {})
+        # Tag yang dihapus atau diganti namanya setelah model dilatih; model masih bisa memprediksinya
+        self.removed_tags = frozenset(removed_tags)
+        self._weigh()
+
+    # Bobot tf-idf yang sudah dinormalisasi per pola, dihitung ulang setiap indeks berubah
+    def _weigh(self):
+        n_docs = self.counts.shape[0]
+        df = np.bincount(self.counts.indices, minlength=len(self.terms))
+        self.idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+        weighted = self.counts @ sp.diags(self.idf)
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        self.weights = (sp.diags(1 / norms) @ weighted).tocsr()
+        self.columns = self.weights.tocsc()
+
+    def __len__(self):
+        return len(self.doc_tags)
+
+    @staticmethod
+    def _rows(intents, tokens, term_index, terms):
+        data, indices, indptr, tags, ids = [], [], [0], [], []
+        for intent in intents:
+            for pattern in intent['patterns']:
+                row = {}
+                for token in tokens(pattern):
+                    col = term_index.get(token)
+                    if col is None:
+                        col = term_index[token] = len(terms)
+                        terms.append(token)
+                    row[col] = row.get(col, 0) + 1
+                indices.extend(row)
+                data.extend(row.values())
+                indptr.append(len(indices))
+                tags.append(intent['tag'])
+                ids.append(intent.get('id', -1))
+        return data, indices, indptr, tags, ids
+
+    @classmethod
+    def from_intents(cls, intents, tokens):
+        terms, term_index = [], {}
+        data, indices, indptr, tags, ids = cls._rows(intents, tokens, term_index, terms)
+        counts = sp.csr_matrix((data, indices, indptr), shape=(len(tags), len(terms)))
+        return cls(terms, tags, ids, counts)
+
+    # Indeks baru dengan pola milik intent `changed` diganti dan intent `removed` dibuang. Hanya
+    # pola yang berubah yang ditokenisasi ulang; baris lain disalin dari matriks lama.
+    def update(self, changed, removed, tokens):
+        changed_ids = [i['id'] for i in changed]
+        replaced = np.isin(self.doc_ids, changed_ids + list(removed))
+        # Pola dari data.json lama (tanpa id) dicocokkan lewat tag
+        replaced |= (self.doc_ids == -1) & np.isin(self.doc_tags, [i['tag'] for i in changed])
+        keep = ~replaced
+
+        terms, term_index = list(self.terms), dict(self.term_index)
+        data, indices, indptr, tags, ids = self._rows(changed, tokens, term_index, terms)
+
+        kept = self.counts[keep]
+        kept = sp.csr_matrix((kept.data, kept.indices, kept.indptr), shape=(kept.shape[0], len(terms)))
+        added = sp.csr_matrix((data, indices, indptr), shape=(len(tags), len(terms)))
+
+        doc_tags = np.concatenate([self.doc_tags[keep], np.asarray(tags, dtype=str)])
+        # Tag intent yang dihapus atau tag lama intent yang diganti namanya (tidak ada lagi pola
+        # dengan tag itu): responnya dibuang dan tag dicatat agar tidak dijawab lagi
+        gone = set(self.doc_tags[replaced].tolist()) - set(doc_tags.tolist())
+        responses = {tag: r for tag, r in self.responses.items() if tag not in gone}
+        responses.update({i['tag']: tuple(i['responses']) for i in changed if i['responses']})
+        return TfidfRetriever(
+            terms,
+            doc_tags,
+            np.concatenate([self.doc_ids[keep], np.asarray(ids, dtype=np.int64)]),
+            sp.vstack([kept, added], format='csr'),
+            responses,
+            (self.removed_tags | gone) - {i['tag'] for i in changed},
+        )
+
+    # Skor cosine pertanyaan terhadap semua pola; mengembalikan (tag, skor) terbaik per tag.
+    # Hanya kolom term pertanyaan yang dibaca (matriks CSC), jadi biayanya mengikuti jumlah pola
+    # yang berbagi term dengan pertanyaan, bukan jumlah seluruh pola.
+    def search(self, tokens, top=3):
+        # Term yang tersisa di kosakata setelah semua polanya dihapus diperlakukan seperti kata
+        # yang tidak dikenal, agar skor sama dengan indeks yang dibangun ulang dari awal
+        indptr = self.columns.indptr
+        counts = {}
+        for token in tokens:
+            col = self.term_index.get(token)
+            if col is not None and indptr[col + 1] > indptr[col]:
+                counts[col] = counts.get(col, 0) + 1
+        if not counts or not len(self):
+            return []
+        cols = list(counts)
+        query = np.fromiter(counts.values(), dtype=np.float32, count=len(counts)) * self.idf[cols]
+        query /= np.linalg.norm(query)
+
+        columns = self.columns
+        spans = [slice(indptr[c], indptr[c + 1]) for c in cols]
+        rows = np.concatenate([columns.indices[s] for s in spans])
+        values = np.concatenate([columns.data[s] * q for s, q in zip(spans, query)])
+        scores = np.bincount(rows, weights=values)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top * 4:
+            candidates = candidates[np.argpartition(-scores[candidates], top * 4)[:top * 4]]
+        results, seen = [], set()
+        for row in candidates[np.argsort(-scores[candidates], kind='stable')]:
+            tag = str(self.doc_tags[row])
+            if tag in seen:
+                continue
+            seen.add(tag)
+            results.append((tag, float(scores[row])))
+            if len(results) == top:
+                break
+        return results
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez_compressed(
+                f, data=self.counts.data, indices=self.counts.indices, indptr=self.counts.indptr,
+                terms=np.asarray(self.terms, dtype=str), tags=self.doc_tags, ids=self.doc_ids,
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            terms, tags = f['terms'].tolist(), f['tags']
+            counts = sp.csr_matrix((f['data'], f['indices'], f['indptr']), shape=(len(tags), len(terms)))
+            return cls(terms, tags, f['ids'], counts)
+
+    def stats(self):
+        return {'patterns': len(self), 'terms': len(self.terms), 'nnz': int(self.counts.nnz),
+                'updated_intents': len(self.responses), 'removed_intents': len(self.removed_tags)}
+
+
+# Artefak retriever hasil training (jika ada) atau dibangun dari intents versi tersebut
+def load_or_build(directory, intents, tokens):
+    path = os.path.join(directory, RETRIEVER_FILE)
+    if os.path.exists(path):
+        return TfidfRetriever.load(path)
+    return TfidfRetriever.from_intents(intents, tokens)
@@ -1,46 +1,70 @@
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash
+from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash, Response
+from flask_login import current_user
 from config import get_db_connection
 from email_service import send_email
 from auth import admin_required, login_required
+from exports import export_response, parse_date_range, build_filters, FORMATS
+from queue_events import broker, notify_change, admin_view, user_view, format_event
+import queue
+import os
 
 antrian_bp = Blueprint('antrian_bp', __name__)
 
-# Fungsi untuk mendapatkan nomor antrian terbaru
-def get_next_antrian():
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT COALESCE(MAX(nomor_antrian), 0) + 1 FROM antrian_ktp")
-            return cur.fetchone()[0]
+# Interval komentar keep-alive pada stream SSE (detik)
+STREAM_HEARTBEAT = float(os.getenv('ANTRIAN_STREAM_HEARTBEAT', 15))
+
+# Ambil nomor tiket berikutnya untuk hari ini. Baris counter terkunci sampai transaksi pemanggil
+# selesai, sehingga pendaftaran bersamaan tidak pernah mendapat nomor yang sama
+def allocate_ticket(cur):
+    cur.execute("""
+        INSERT INTO antrian_counter (tanggal, last_number)
+        VALUES (CURRENT_DATE, 1)
+        ON CONFLICT (tanggal) DO UPDATE SET last_number = antrian_counter.last_number + 1
+        RETURNING tanggal, last_number
+    """)
+    return cur.fetchone()
+
+# Posisi dalam antrian = jumlah tiket menunggu yang lebih awal + 1
+def queue_position(cur, tanggal, nomor_antrian):
+    cur.execute("""
+        SELECT COUNT(*) + 1 FROM antrian_ktp
+        WHERE status = 'Menunggu' AND (tanggal, nomor_antrian) < (%s, %s)
+    """, (tanggal, nomor_antrian))
+    return cur.fetchone()[0]
 
 # Endpoint untuk menambahkan antrian KTP
 @antrian_bp.route('/daftar', methods=['POST'])
 @login_required
 def daftar_antrian():
     data = request.json
-    user_id = data.get('user_id')
+    # Pemilik tiket selalu user yang login (kolom user_id kini FK ke users)
+    user_id = current_user.id
     nama = data.get('nama')
     email = data.get('email')
 
-    if not all([user_id, nama, email]):
+    if not all([nama, email]):
         return jsonify({'error': 'Data tidak lengkap'}), 400
 
-    nomor_antrian = get_next_antrian()
-
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
+                tanggal, nomor_antrian = allocate_ticket(cur)
                 cur.execute("""
-                    INSERT INTO antrian_ktp (user_id, nama, email, nomor_antrian)
-                    VALUES (%s, %s, %s, %s)
-                """, (user_id, nama, email, nomor_antrian))
+                    INSERT INTO antrian_ktp (user_id, nama, email, nomor_antrian, tanggal)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (user_id, nama, email, nomor_antrian, tanggal))
+                notify_change(cur)
                 conn.commit()
 
+                # Dihitung setelah commit agar kunci counter dilepas secepatnya
+                posisi = queue_position(cur, tanggal, nomor_antrian)
+
         # Kirim email notifikasi
         subject = "Nomor Antrian KTP Anda"
-        body = f"Halo {nama},\n\nNomor antrian KTP Anda adalah {nomor_antrian}.\nHarap datang sesuai jadwal.\n\nTerima kasih!"
+        body = f"Halo {nama},\n\nNomor antrian KTP Anda adalah {nomor_antrian} (posisi ke-{posisi} dalam antrian).\nHarap datang sesuai jadwal.\n\nTerima kasih!"
         send_email(email, subject, body)
 
-        return jsonify({'message': 'Antrian berhasil didaftarkan dan email notifikasi telah dikirim', 'nomor_antrian': nomor_antrian}), 201
+        return jsonify({'message': 'Antrian berhasil didaftarkan dan email notifikasi telah dikirim', 'nomor_antrian': nomor_antrian, 'posisi': posisi}), 201
 
     except Exception as e:
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
@@ -53,11 +77,18 @@ def list_antrian():
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT id, user_id, nama, email, nomor_antrian, status, created_at FROM antrian_ktp ORDER BY status ASC")
+                cur.execute("""
+                    SELECT id, user_id, nama, email, nomor_antrian, status, created_at,
+                           CASE WHEN status = 'Menunggu'
+                                THEN ROW_NUMBER() OVER (PARTITION BY status = 'Menunggu' ORDER BY tanggal, nomor_antrian)
+                           END AS posisi
+                    FROM antrian_ktp
+                    ORDER BY status ASC, tanggal, nomor_antrian
+                """)
                 antrian = cur.fetchall()
 
         result = [
-            {'id': a[0], 'user_id': a[1], 'nama': a[2], 'email': a[3], 'nomor_antrian': a[4], 'status': a[5], 'created_at': a[6]}
+            {'id': a[0], 'user_id': a[1], 'nama': a[2], 'email': a[3], 'nomor_antrian': a[4], 'status': a[5], 'created_at': a[6], 'posisi': a[7]}
             for a in antrian
         ]
 
@@ -66,6 +97,30 @@ def list_antrian():
     except Exception as e:
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
 
+ANTRIAN_EXPORT_COLUMNS = ['id', 'user_id', 'nama', 'email', 'tanggal', 'nomor_antrian', 'status', 'created_at']
+
+# Endpoint ekspor antrian (?format=csv|jsonl&since=YYYY-MM-DD&until=YYYY-MM-DD&status=<status>)
+@antrian_bp.route('/export', methods=['GET'])
+@login_required
+@admin_required
+def export_antrian():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Format '{fmt}' tidak didukung (csv atau jsonl)"}), 400
+    try:
+        since, until = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        where, params = build_filters('created_at', since, until, status=request.args.get('status'))
+        return export_response(
+            f"SELECT {', '.join(ANTRIAN_EXPORT_COLUMNS)} FROM antrian_ktp {where} ORDER BY id",
+            params, ANTRIAN_EXPORT_COLUMNS, fmt, 'antrian')
+
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
 # Endpoint untuk mengupdate status antrian
 @antrian_bp.route('/update/<int:id>', methods=['POST'])
 @login_required
@@ -79,27 +134,11 @@ def update_antrian(id):
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                # Ambil nomor antrian dari ID yang ingin diupdate
-                cur.execute("SELECT nomor_antrian FROM antrian_ktp WHERE id = %s", (id,))
-                result = cur.fetchone()
-                if result is None:
+                # Nomor tiket tetap; posisi antrian lain turun dengan sendirinya karena dihitung dari urutan tiket
+                cur.execute("UPDATE antrian_ktp SET status = %s WHERE id = %s", (status, id))
+                if cur.rowcount == 0:
                     return jsonify({'error': 'Antrian tidak ditemukan'}), 404
-
-                current_no = result[0]
-
-                # Update status dan set nomor_antrian = 0
-                cur.execute("""
-                    UPDATE antrian_ktp
-                    SET status = %s, nomor_antrian = 0
-                    WHERE id = %s
-                """, (status, id))
-
-                # Geser semua antrian setelahnya
-                cur.execute("""
-                    UPDATE antrian_ktp
-                    SET nomor_antrian = nomor_antrian - 1
-                    WHERE nomor_antrian > %s
-                """, (current_no,))
+                notify_change(cur)
 
                 conn.commit()
 
@@ -108,6 +147,39 @@ def update_antrian(id):
     except Exception as e:
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
 
+# Stream SSE posisi antrian: admin menerima seluruh antrian, warga hanya tiket miliknya
+@antrian_bp.route('/stream', methods=['GET'])
+@login_required
+def stream_antrian():
+    is_admin = current_user.role == 'admin'
+    user_id = current_user.id
+
+    try:
+        subscription = broker.subscribe()
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+    def events():
+        last = None
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    version, waiting = subscription.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                payload = admin_view(waiting) if is_admin else user_view(waiting, user_id)
+                # Pendaftar baru di belakang tidak mengubah posisi warga, jadi tidak perlu dikirim
+                if payload != last:
+                    last = payload
+                    yield format_event(version, payload)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # Endpoint untuk reset antrian
 @antrian_bp.route('/reset', methods=['POST'])
 @login_required
@@ -117,8 +189,9 @@ def reset_antrian():
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cur:
-                    # Hapus semua data dan reset ID (auto increment)
-                    cur.execute("TRUNCATE TABLE antrian_ktp RESTART IDENTITY CASCADE")
+                    # Hapus semua data, reset ID (auto increment) dan counter nomor tiket
+                    cur.execute("TRUNCATE TABLE antrian_ktp, antrian_counter RESTART IDENTITY CASCADE")
+                    notify_change(cur)
                     conn.commit()
                     
             flash('Antrian berhasil direset', 'success')
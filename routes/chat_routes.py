@@ -1,10 +1,59 @@
 from flask import Blueprint, request, jsonify, render_template
+from datetime import datetime
 from config import get_db_connection
 from auth import admin_required, login_required, current_user
+from exports import export_response, parse_date_range, build_filters, FORMATS
 
 chat_bp = Blueprint('chat_bp', __name__)
 
-# Endpoint untuk menambahkan chat ke dalam history
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+# Cursor keyset berbentuk "<timestamp ISO>_<id>" dari chat tertua di halaman sebelumnya
+def encode_cursor(timestamp, chat_id):
+    return f"{timestamp.isoformat()}_{chat_id}"
+
+def decode_cursor(cursor):
+    try:
+        timestamp, chat_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(timestamp), int(chat_id)
+    except (AttributeError, ValueError):
+        return None
+
+# Ambil satu halaman riwayat chat (terbaru lebih dulu) memakai index (user_id, timestamp, id)
+def fetch_chat_page(user_id, before=None, limit=HISTORY_PAGE_SIZE):
+    params = [user_id]
+    condition = ""
+    if before:
+        condition = "AND (timestamp, id) < (%s, %s)"
+        params.extend(before)
+    params.append(limit + 1)
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT id, message, response, timestamp
+                FROM chat_history
+                WHERE user_id = %s {condition}
+                ORDER BY timestamp DESC, id DESC
+                LIMIT %s
+            """, params)
+            rows = cur.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][3], rows[-1][0])
+
+    # Tampilkan dalam urutan kronologis
+    history = [
+        {'id': c[0], 'message': c[1], 'response': c[2], 'timestamp': c[3],
+         'time': c[3].strftime('%Y-%m-%d %H:%M:%S')}
+        for c in reversed(rows)
+    ]
+    return history, next_cursor
+
+# Endpoint untuk menambahkan chat ke dalam history (klien lama; /get kini mencatat sendiri lewat chat_logger)
 @chat_bp.route('/add', methods=['POST'])
 @login_required
 def add_chat():
@@ -29,78 +78,133 @@ def add_chat():
     except Exception as e:
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
 
-# Endpoint untuk mendapatkan chat history berdasarkan user_id
+# Endpoint untuk mendapatkan chat history berdasarkan user_id (per halaman, ?before=<cursor>&limit=<n>)
 @chat_bp.route('/history', methods=['GET'])
 @login_required
 def get_chat_history():
+    before = request.args.get('before')
+    cursor = decode_cursor(before) if before else None
+    if before and cursor is None:
+        return jsonify({'error': 'Cursor tidak valid'}), 400
+
+    limit = min(max(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), 1), HISTORY_MAX_PAGE_SIZE)
+
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT message, response, timestamp 
-                    FROM chat_history 
-                    WHERE user_id = %s 
-                    ORDER BY timestamp ASC
-                """, (str(current_user.id),))  
-                
-                chats = cur.fetchall()
-        
-        history = [{'message': c[0], 'response': c[1], 'timestamp': c[2]} for c in chats]
-        return jsonify({'history': history}), 200
+        history, next_cursor = fetch_chat_page(current_user.id, cursor, limit)
+        return jsonify({'history': history, 'next_cursor': next_cursor}), 200
 
     except Exception as e:
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
 
 
 
-# Endpoint untuk mendapatkan semua chat history
+ADMIN_USERS_PAGE_SIZE = 25
+
+# Endpoint untuk mendapatkan semua chat history (daftar user per halaman, transkrip dimuat terpisah).
+# Daftar dibaca dari chat_last_message (pesan terakhir per user, dijaga trigger) lewat index
+# (timestamp, user_id); halaman berikutnya memakai cursor keyset ?before=<timestamp>_<user_id>, jadi
+# halaman jauh sama murahnya dengan halaman pertama. ?page hanya untuk penomoran; total halaman
+# tidak dihitung agar tidak perlu memindai semua user.
 @chat_bp.route('/get', methods=['GET'])
 @login_required
 @admin_required
 def history():
+    page = max(request.args.get('page', 1, type=int), 1)
+    before = request.args.get('before')
+    cursor = decode_cursor(before) if before else None
+    if before and cursor is None:
+        return jsonify({'error': 'Cursor tidak valid'}), 400
+
+    params = []
+    condition = ""
+    if cursor:
+        condition = "WHERE (last.timestamp, last.user_id) < (%s, %s)"
+        params.extend(cursor)
+    params.append(ADMIN_USERS_PAGE_SIZE + 1)
+
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                # Ambil daftar user unik dengan last_message_time
-                cur.execute("""
-                    SELECT ch.user_id, u.email, MAX(ch.timestamp) AS last_message_time
-                    FROM chat_history ch
-                    JOIN users u ON CAST(ch.user_id AS INTEGER) = u.id
-                    GROUP BY ch.user_id, u.email
-                    ORDER BY last_message_time DESC
-                """)
+                cur.execute(f"""
+                    SELECT last.user_id, u.email, last.timestamp, last.message
+                    FROM chat_last_message last
+                    JOIN users u ON u.id = last.user_id
+                    {condition}
+                    ORDER BY last.timestamp DESC, last.user_id DESC
+                    LIMIT %s
+                """, params)
                 users = cur.fetchall()
 
-                user_chat_data = []
-
-                for user in users:
-                    user_id, email, last_message_time = user
-                    
-                    # Ambil semua message dan response untuk setiap user_id
-                    cur.execute("""
-                        SELECT message, response, timestamp 
-                        FROM chat_history 
-                        WHERE user_id = %s 
-                        ORDER BY timestamp ASC
-                    """, (user_id,))
-                    chats = cur.fetchall()
-
-                    chat_history = [
-                        {'message': c[0], 'response': c[1], 'timestamp': c[2]} for c in chats
-                    ]
-
-                    user_chat_data.append({
-                        'user_id': user_id,
-                        'email': email,
-                        'last_message_time': last_message_time,
-                        'chats': chat_history  # Semua chat dari user ini
-                    })
-
-        return render_template('history.html', users=user_chat_data), 200
+        next_cursor = None
+        if len(users) > ADMIN_USERS_PAGE_SIZE:
+            users = users[:ADMIN_USERS_PAGE_SIZE]
+            next_cursor = encode_cursor(users[-1][2], users[-1][0])
+
+        user_chat_data = [
+            {
+                'user_id': u[0],
+                'email': u[1],
+                'last_message_time': u[2],
+                'last_message': u[3]
+            }
+            for u in users
+        ]
+
+        return render_template(
+            'history.html',
+            users=user_chat_data,
+            page=page,
+            page_size=ADMIN_USERS_PAGE_SIZE,
+            next_cursor=next_cursor
+        ), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+# Endpoint transkrip chat satu user untuk admin (per halaman, ?before=<cursor>)
+@chat_bp.route('/get/<int:user_id>', methods=['GET'])
+@login_required
+@admin_required
+def user_transcript(user_id):
+    before = request.args.get('before')
+    cursor = decode_cursor(before) if before else None
+    if before and cursor is None:
+        return jsonify({'error': 'Cursor tidak valid'}), 400
+
+    limit = min(max(request.args.get('limit', HISTORY_MAX_PAGE_SIZE, type=int), 1), HISTORY_MAX_PAGE_SIZE)
+
+    try:
+        history, next_cursor = fetch_chat_page(user_id, cursor, limit)
+        return jsonify({'history': history, 'next_cursor': next_cursor}), 200
 
     except Exception as e:
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
 
+CHAT_EXPORT_COLUMNS = ['id', 'user_id', 'email', 'message', 'response', 'intent', 'confidence', 'timestamp']
 
+# Endpoint ekspor riwayat chat (?format=csv|jsonl&since=YYYY-MM-DD&until=YYYY-MM-DD&user_id=<id>)
+@chat_bp.route('/export', methods=['GET'])
+@login_required
+@admin_required
+def export_chat_history():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Format '{fmt}' tidak didukung (csv atau jsonl)"}), 400
+    try:
+        since, until = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    try:
+        where, params = build_filters('ch.timestamp', since, until,
+                                      **{'ch.user_id': request.args.get('user_id', type=int)})
+        return export_response(f"""
+            SELECT ch.id, ch.user_id, u.email, ch.message, ch.response, ch.intent, ch.confidence, ch.timestamp
+            FROM chat_history ch
+            LEFT JOIN users u ON u.id = ch.user_id
+            {where}
+            ORDER BY ch.id
+        """, params, CHAT_EXPORT_COLUMNS, fmt, 'chat_history')
 
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
@@ -1,9 +1,19 @@
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash
+from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash, Response
 from config import get_db_connection
 from auth import admin_required, login_required
-from training import train_data
+from training_jobs import enqueue_training, get_job, list_jobs, run_worker
+import model_registry
+import intent_store
+import click
+import io
+import os
 
-data_bp = Blueprint('data_bp', __name__)
+data_bp = Blueprint('data_bp', __name__, cli_group='data')
+
+# Format impor/ekspor ditentukan dari parameter atau ekstensi file
+def _detect_format(fmt, filename):
+    fmt = (fmt or os.path.splitext(filename or '')[1].lstrip('.')).lower()
+    return 'jsonl' if fmt in ('jsonl', 'ndjson', 'json') else fmt
 
 # Endpoint untuk menambahkan data
 @data_bp.route('/add', methods=['POST'])
@@ -24,20 +34,16 @@ def add_chatbot_data():
         return redirect(url_for('data_bp.list_chatbot_data'))
 
     try:
-        patterns_str = "|".join(patterns)[:1000]
-        responses_str = "|".join(responses)[:1000]
-
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO data (tag, patterns, responses)
-                    VALUES (%s, %s, %s)
-                """, (tag, patterns_str, responses_str))
+                ids = intent_store.insert_intents(cur, [{'tag': tag, 'patterns': patterns, 'responses': responses}])
+                intent_store.record_changes(cur, ids)
                 conn.commit()
-                
-        train_data()
 
-        flash('Data chatbot berhasil ditambahkan', 'success')
+        # Retraining dijalankan worker di background
+        enqueue_training(f"tambah '{tag}'")
+
+        flash('Data chatbot berhasil ditambahkan, model sedang dilatih ulang', 'success')
         return redirect(url_for('data_bp.list_chatbot_data'))
 
     except Exception as e:
@@ -51,23 +57,10 @@ def list_chatbot_data():
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id, tag, patterns, responses, created_at
-                    FROM data
-                    ORDER BY created_at ASC
-                """)
-                rows = cur.fetchall()
-
-        result = [
-            {
-                'id': row[0],
-                'tag': row[1],
-                'patterns': row[2].split('|'),     # konversi string ke list
-                'responses': row[3].split('|'),    # konversi string ke list
-                'created_at': row[4]
-            }
-            for row in rows
-        ]
+                existing = intent_store.fetch_intents(cur)
+
+        result = sorted((row for rows in existing.values() for row in rows),
+                        key=lambda row: (row['created_at'], row['id']))
 
         return render_template('chatbot.html', data=result), 200
 
@@ -92,24 +85,28 @@ def update_chatbot_data(id):
         return redirect(url_for('data_bp.list_chatbot_data'))
 
     try:
-        patterns_str = "|".join(patterns)[:1000]
-        responses_str = "|".join(responses)[:1000]
-
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("""
-                    UPDATE data
-                    SET tag = %s,
-                        patterns = %s,
-                        responses = %s
-                    WHERE id = %s
-                """, (tag, patterns_str, responses_str, id))
-                conn.commit()
+                # Kunci baris intent agar dua edit bersamaan tidak menghitung perubahan dari isi lama
+                cur.execute("SELECT id FROM data WHERE id = %s FOR UPDATE", (id,))
+                current = [row for rows in intent_store.fetch_intents(cur, ids=[id]).values() for row in rows]
+                if not current:
+                    flash('Data chatbot tidak ditemukan', 'danger')
+                    return redirect(url_for('data_bp.list_chatbot_data'))
 
-        # retraining model
-        train_data()
+                # Hanya pola/respon yang berubah yang ditulis ulang
+                intent = {'id': id, 'tag': tag, 'patterns': patterns, 'responses': responses, 'current': current[0]}
+                changed = intent_store.update_intents(cur, [intent]) or tag != current[0]['tag']
+                if changed:
+                    intent_store.record_changes(cur, [id])
+                conn.commit()
 
-        flash('Data chatbot berhasil diubah', 'success')
+        if changed:
+            # retraining model di background
+            enqueue_training(f"ubah '{tag}'")
+            flash('Data chatbot berhasil diubah, model sedang dilatih ulang', 'success')
+        else:
+            flash('Tidak ada perubahan pada data chatbot', 'info')
         return redirect(url_for('data_bp.list_chatbot_data'))
 
     except Exception as e:
@@ -125,12 +122,176 @@ def delete_chatbot_data(id):
         with get_db_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("DELETE FROM data WHERE id = %s", (id,))
+                if cur.rowcount:
+                    intent_store.record_changes(cur, [id])
                 conn.commit()
 
-        train_data()
-        
-        flash('Data chatbot berhasil dihapus', 'success')
+        enqueue_training(f"hapus data #{id}")
+
+        flash('Data chatbot berhasil dihapus, model sedang dilatih ulang', 'success')
         return redirect(url_for('data_bp.list_chatbot_data'))
 
     except Exception as e:
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+# Endpoint untuk melihat status job training terbaru
+@data_bp.route('/training/status', methods=['GET'])
+@login_required
+@admin_required
+def training_status():
+    try:
+        jobs = list_jobs(limit=int(request.args.get('limit', 10)))
+        current = next((j for j in jobs if j['status'] in ('running', 'queued')), None)
+        return jsonify({'current': current, 'jobs': jobs}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+# Endpoint untuk melihat progress satu job training
+@data_bp.route('/training/jobs/<int:job_id>', methods=['GET'])
+@login_required
+@admin_required
+def training_job(job_id):
+    try:
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job tidak ditemukan'}), 404
+        return jsonify(job), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+# Endpoint untuk melihat versi model yang tersimpan di registry
+@data_bp.route('/models', methods=['GET'])
+@login_required
+@admin_required
+def list_model_versions():
+    try:
+        versions = []
+        for version in reversed(model_registry.list_versions()):
+            manifest = model_registry.load_manifest(version)
+            versions.append({
+                'version': version,
+                'created_at': manifest.get('created_at'),
+                'metadata': manifest.get('metadata', {})
+            })
+        return jsonify({'current': model_registry.current_version(), 'versions': versions}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+# Endpoint untuk kembali ke versi model sebelumnya (atau versi tertentu)
+@data_bp.route('/models/rollback', methods=['POST'])
+@login_required
+@admin_required
+def rollback_model():
+    try:
+        version = model_registry.rollback(request.form.get('version') or None)
+        return jsonify({'message': f'Model aktif sekarang versi {version}', 'current': version}), 200
+
+    except model_registry.RegistryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+# Endpoint impor intent massal dari file JSONL/CSV (form: file, mode=merge|replace, dry_run=1)
+@data_bp.route('/import', methods=['POST'])
+@login_required
+@admin_required
+def import_chatbot_data():
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'File tidak ditemukan'}), 400
+
+    replace = request.form.get('mode', 'merge') == 'replace'
+    dry_run = request.form.get('dry_run') in ('1', 'true', 'on')
+
+    try:
+        fmt = _detect_format(request.form.get('format'), upload.filename)
+        lines = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        intents, errors = intent_store.parse(lines, fmt)
+        if errors:
+            return jsonify({'error': 'File tidak valid', 'details': errors[:50]}), 400
+
+        with get_db_connection() as conn:
+            summary = intent_store.import_intents(conn, intents, replace=replace, dry_run=dry_run)
+
+        changed = summary['added'] or summary['changed'] or summary['removed']
+        if changed and not dry_run:
+            enqueue_training(f"impor {len(summary['added'])} baru, {len(summary['changed'])} diubah, {summary['removed']} dihapus")
+        return jsonify({'dry_run': dry_run, 'training_queued': bool(changed and not dry_run), **summary}), 200
+
+    except intent_store.IntentImportError as e:
+        return jsonify({'error': 'Data tidak valid', 'details': e.errors[:50]}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+# Endpoint ekspor semua intent (?format=jsonl|csv)
+@data_bp.route('/export', methods=['GET'])
+@login_required
+@admin_required
+def export_chatbot_data():
+    fmt = _detect_format(request.args.get('format', 'jsonl'), None)
+    if fmt not in ('jsonl', 'csv'):
+        return jsonify({'error': f"Format '{fmt}' tidak didukung (jsonl atau csv)"}), 400
+
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                existing = intent_store.fetch_intents(cur)
+
+        mimetype = 'application/x-ndjson' if fmt == 'jsonl' else 'text/csv'
+        return Response(intent_store.export_lines(existing, fmt), mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename=intents.{fmt}'})
+
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+# CLI: flask --app app data import intents.jsonl [--replace] [--dry-run]
+@data_bp.cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', default=None, help='jsonl atau csv (default: dari ekstensi file)')
+@click.option('--replace', is_flag=True, help='Hapus intent yang tidak ada di file')
+@click.option('--dry-run', is_flag=True, help='Tampilkan perbedaan tanpa menyimpan')
+@click.option('--no-train', is_flag=True, help='Jangan daftarkan retraining')
+def import_command(path, fmt, replace, dry_run, no_train):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        intents, errors = intent_store.parse(f, _detect_format(fmt, path))
+    if errors:
+        for error in errors:
+            click.echo(f"[X] {error}")
+        raise SystemExit(1)
+
+    try:
+        with get_db_connection() as conn:
+            summary = intent_store.import_intents(conn, intents, replace=replace, dry_run=dry_run)
+    except intent_store.IntentImportError as e:
+        for error in e.errors:
+            click.echo(f"[X] {error}")
+        raise SystemExit(1)
+
+    click.echo(f"[{'i' if dry_run else '✓'}] {len(summary['added'])} baru, {len(summary['changed'])} diubah, "
+               f"{summary['removed']} dihapus, {summary['unchanged']} tetap")
+    if (summary['added'] or summary['changed'] or summary['removed']) and not dry_run and not no_train:
+        # Worker embedded (proses daemon) ikut mati saat CLI selesai, jadi training dijalankan di sini
+        job_id = enqueue_training(f"impor CLI {os.path.basename(path)}", start_worker=False)
+        click.echo(f"[i] Retraining didaftarkan (job #{job_id})")
+        if os.getenv('TRAINING_WORKER', 'embedded') != 'embedded':
+            click.echo("[i] Job akan dijalankan oleh worker training (python training_jobs.py)")
+        elif not run_worker(once=True, wait_for_lock=False):
+            click.echo("[i] Worker training lain sedang aktif dan akan menjalankan job ini")
+
+# CLI: flask --app app data export intents.csv [--format csv]
+@data_bp.cli.command('export')
+@click.argument('path', type=click.Path(dir_okay=False))
+@click.option('--format', 'fmt', default=None, help='jsonl atau csv (default: dari ekstensi file)')
+def export_command(path, fmt):
+    fmt = _detect_format(fmt, path)
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            existing = intent_store.fetch_intents(cur)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.writelines(intent_store.export_lines(existing, fmt))
+    click.echo(f"[✓] {sum(len(rows) for rows in existing.values())} intent diekspor ke '{path}'")
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for
 from config import get_db_connection
 from email_service import send_email
-from auth import admin_required, login_required
+from auth import admin_required, login_required, current_user
+from exports import export_response, parse_date_range, build_filters, FORMATS
 
 pengaduan_bp = Blueprint('pengaduan_bp', __name__)
 
@@ -10,13 +11,14 @@ pengaduan_bp = Blueprint('pengaduan_bp', __name__)
 @login_required
 def add_pengaduan():
     data = request.json
-    user_id = data.get('user_id')
+    # Pemilik pengaduan selalu user yang login (kolom user_id kini FK ke users)
+    user_id = current_user.id
     nama = data.get('nama')
     email = data.get('email')
     kategori = data.get('kategori')
     isi_pengaduan = data.get('isi_pengaduan')
 
-    if not all([user_id, nama, email, kategori, isi_pengaduan]):
+    if not all([nama, email, kategori, isi_pengaduan]):
         return jsonify({'error': 'Data tidak lengkap'}), 400
 
     try:
@@ -38,15 +40,23 @@ def add_pengaduan():
     except Exception as e:
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
 
-# Endpoint untuk melihat semua pengaduan
+# Endpoint untuk melihat semua pengaduan (opsional ?status=<status>, memakai index (status, created_at))
 @pengaduan_bp.route('/list', methods=['GET'])
 @login_required
 @admin_required
 def list_pengaduan():
+    status = request.args.get('status')
+
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT id, user_id, nama, email, kategori, isi_pengaduan, status, created_at FROM pengaduan ORDER BY created_at DESC")
+                if status:
+                    cur.execute("""
+                        SELECT id, user_id, nama, email, kategori, isi_pengaduan, status, created_at
+                        FROM pengaduan WHERE status = %s ORDER BY created_at DESC
+                    """, (status,))
+                else:
+                    cur.execute("SELECT id, user_id, nama, email, kategori, isi_pengaduan, status, created_at FROM pengaduan ORDER BY created_at DESC")
                 pengaduan = cur.fetchall()
 
         result = [
@@ -68,6 +78,30 @@ def list_pengaduan():
     except Exception as e:
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
 
+PENGADUAN_EXPORT_COLUMNS = ['id', 'user_id', 'nama', 'email', 'kategori', 'isi_pengaduan', 'status', 'created_at']
+
+# Endpoint ekspor pengaduan (?format=csv|jsonl&since=YYYY-MM-DD&until=YYYY-MM-DD&status=<status>)
+@pengaduan_bp.route('/export', methods=['GET'])
+@login_required
+@admin_required
+def export_pengaduan():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Format '{fmt}' tidak didukung (csv atau jsonl)"}), 400
+    try:
+        since, until = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        where, params = build_filters('created_at', since, until, status=request.args.get('status'))
+        return export_response(
+            f"SELECT {', '.join(PENGADUAN_EXPORT_COLUMNS)} FROM pengaduan {where} ORDER BY id",
+            params, PENGADUAN_EXPORT_COLUMNS, fmt, 'pengaduan')
+
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
 # Endpoint untuk mengupdate status pengaduan
 @pengaduan_bp.route('/update/<int:id>', methods=['POST'])
 @login_required
@@ -0,0 +1,148 @@
+import os
+from functools import lru_cache
+import numpy as np
+
+# Kata sependek ini tidak dikoreksi (terlalu banyak tetangga: "kak" -> "kk")
+MIN_LENGTH = int(os.getenv('SPELLING_MIN_LENGTH', 4))
+CACHE_SIZE = int(os.getenv('SPELLING_CACHE_SIZE', 10000))
+# Kandidat yang dicek jaraknya per tahap (urut dari trigram terbanyak) agar latensi tetap terbatas
+MAX_CANDIDATES = int(os.getenv('SPELLING_MAX_CANDIDATES', 50))
+
+
+# Jarak edit maksimal yang diterima untuk panjang kata tertentu
+def max_distance(length):
+    return 1 if length <= 5 else 2
+
+# Trigram beserta posisinya di kata yang diberi penanda awal/akhir ("$$kk$")
+def trigrams(word):
+    padded = f"$${word}$"
+    return [(i, padded[i:i + 3]) for i in range(len(padded) - 2)]
+
+# Cek cepat jarak <= 1 (satu sisip/hapus/ganti/tukar huruf bersebelahan) dengan perbandingan irisan
+def within_one(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > 1:
+        return False
+    i = 0
+    while i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) != len(b):
+        return a[i + 1:] == b[i:]
+    if i == len(a):
+        return True
+    return a[i + 1:] == b[i + 1:] or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2] and a[i + 2:] == b[i + 2:])
+
+# Jarak Damerau-Levenshtein (optimal string alignment) yang hanya menghitung pita |i - j| <= limit
+# dan berhenti lebih awal begitu satu baris melewati batas; hasil > limit dikembalikan sebagai limit + 1
+def bounded_distance(a, b, limit):
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    previous2 = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] + (a[i - 1] != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1] and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+class SpellingIndex:
+    """Indeks trigram karakter atas kosakata model untuk memetakan kata salah ketik ke kata terdekat."""
+
+    def __init__(self, words, min_length=MIN_LENGTH, cache_size=CACHE_SIZE, max_candidates=MAX_CANDIDATES):
+        self.min_length = min_length
+        self.max_candidates = max_candidates
+        self.words = [w for w in dict.fromkeys(words) if len(w) >= min_length - 1 and w.replace('-', '').isalpha()]
+        self.known = set(words)
+        self.lengths = np.fromiter((len(w) for w in self.words), dtype=np.int32, count=len(self.words))
+
+        # (trigram, posisi) -> id kata yang memuatnya
+        postings = {}
+        for word_id, word in enumerate(self.words):
+            for position, gram in trigrams(word):
+                postings.setdefault((gram, position), []).append(word_id)
+        self.postings = {key: np.array(ids, dtype=np.int32) for key, ids in postings.items()}
+
+        self.suggest = lru_cache(maxsize=cache_size)(self._suggest)
+
+    def __len__(self):
+        return len(self.words)
+
+    # Kandidat dalam jarak `limit`: sisip/hapus/ganti merusak paling banyak tiga trigram dan
+    # tukar huruf empat, jadi kata dalam jarak k berbagi setidaknya (jumlah trigram - 3k - 1)
+    # trigram, dan setiap trigram yang sama bergeser paling jauh k posisi
+    def _candidates(self, token, grams, limit):
+        arrays = [self.postings[key] for key in (
+            (gram, shifted) for position, gram in grams
+            for shifted in range(max(0, position - limit), position + limit + 1)
+        ) if key in self.postings]
+        if not arrays:
+            return []
+
+        ids, shared = np.unique(np.concatenate(arrays), return_counts=True)
+        lengths = self.lengths[ids]
+        near = np.abs(lengths - len(token)) <= limit
+        ids, shared, lengths = ids[near], shared[near], lengths[near]
+
+        slack = 3 * limit + 1
+        required = np.maximum(max(1, len(grams) - slack), lengths + 1 - slack)
+        keep = shared >= required
+        ids, shared = ids[keep], shared[keep]
+        order = np.argsort(-shared, kind='stable')[:self.max_candidates]
+        return list(zip(shared[order].tolist(), ids[order].tolist()))
+
+    # Jarak 1 dicoba lebih dulu (kasus paling umum, kandidatnya sedikit), baru jarak 2
+    def _suggest(self, token):
+        if token in self.known or len(token) < self.min_length or not token.isalpha():
+            return None
+
+        grams = trigrams(token)
+        for limit in sorted({1, max_distance(len(token))}):
+            best, best_key = None, None
+            for shared, word_id in self._candidates(token, grams, limit):
+                # Kandidat urut dari trigram terbanyak dan jarak < limit sudah dicari di tahap
+                # sebelumnya, jadi kandidat berikutnya yang berbagi lebih sedikit tidak bisa menang
+                if best_key is not None and best_key[0] == limit and shared < -best_key[1]:
+                    break
+                word = self.words[word_id]
+                if limit == 1:
+                    distance = 1 if within_one(token, word) else 2
+                else:
+                    distance = bounded_distance(token, word, limit)
+                if distance > limit:
+                    continue
+                key = (distance, -shared, word)
+                if best_key is None or key < best_key:
+                    best, best_key = word, key
+            if best is not None:
+                return best
+        return None
+
+    # Ganti token yang tidak dikenal dengan kata terdekat di kosakata (jika ada)
+    def correct(self, tokens):
+        corrected = []
+        for token in tokens:
+            suggestion = self.suggest(token)
+            corrected.append(suggestion or token)
+        return corrected
+
+    def cache_info(self):
+        info = self.suggest.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modul aplikasi ada di root proyek (bukan paket), jadi root ditambahkan ke sys.path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
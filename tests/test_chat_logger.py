@@ -0,0 +1,59 @@
+import psycopg2
+
+from chat_logger import ChatLogWriter
+
+BAD = 'x' * 2000
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.rows = []
+        self.down = False
+
+    # Meniru INSERT multi-row: satu baris yang ditolak menggagalkan seluruh batch
+    def write(self, batch):
+        if self.down:
+            return psycopg2.OperationalError('koneksi terputus')
+        if any(item[3] == BAD for item in batch):
+            return psycopg2.DataError('value too long for type character varying(1000)')
+        self.rows.extend(item[1] for item in batch)
+        return None
+
+
+def writer_with(database):
+    writer = ChatLogWriter(batch_size=10)
+    writer._write = database.write
+    return writer
+
+def log(writer, *messages):
+    for message in messages:
+        intent = BAD if message == 'buruk' else 'salam'
+        writer._queue.put_nowait((1, message, 'halo', intent, 0.9, 0.0))
+
+
+def test_rejected_row_is_dropped_and_rest_is_saved():
+    database = FakeDatabase()
+    writer = writer_with(database)
+    log(writer, 'a', 'buruk', 'b')
+
+    assert writer.flush() is True
+    assert database.rows == ['a', 'b']
+    assert writer.stats()['rejected'] == 1
+
+    log(writer, 'c')
+    assert writer.flush() is True
+    assert database.rows == ['a', 'b', 'c']
+
+def test_connection_error_keeps_batch_for_next_flush():
+    database = FakeDatabase()
+    writer = writer_with(database)
+    log(writer, 'a', 'b')
+
+    database.down = True
+    assert writer.flush() is False
+    assert writer.stats()['queued'] == 2
+
+    database.down = False
+    assert writer.flush() is True
+    assert database.rows == ['a', 'b']
+    assert writer.stats()['rejected'] == 0
@@ -0,0 +1,82 @@
+import smtplib
+import threading
+import pytest
+
+import email_service
+
+BATCH = [(1, 'a@example.com', 'Tes', 'isi', 1), (2, 'b@example.com', 'Tes', 'isi', 1),
+         (3, 'c@example.com', 'Tes', 'isi', 1)]
+
+
+class FakeSession:
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.sent = []
+        self.connection = None
+
+    def get(self):
+        return self
+
+    def send(self, msg):
+        error = self.errors.get(msg.recipients[0])
+        if error:
+            raise error
+        self.sent.append(msg.recipients[0])
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    calls = {'sent': [], 'error': []}
+    monkeypatch.setattr(email_service, '_mark_sent', lambda ids: calls['sent'].extend(ids))
+    monkeypatch.setattr(email_service, '_mark_error',
+                        lambda email_id, attempts, error, permanent=False:
+                        calls['error'].append((email_id, type(error).__name__, permanent)))
+    return calls
+
+
+@pytest.mark.parametrize('error, permanent', [
+    (smtplib.SMTPRecipientsRefused({'b@example.com': (550, b'no such user')}), True),
+    (smtplib.SMTPRecipientsRefused({'b@example.com': (451, b'greylisted')}), False),
+    (smtplib.SMTPDataError(554, b'rejected'), True),
+    (ValueError('header tidak valid'), False),
+])
+def test_error_only_affects_that_email(outbox, error, permanent):
+    with email_service.app.app_context():
+        email_service._deliver(BATCH, FakeSession({'b@example.com': error}))
+    assert outbox['sent'] == [1, 3]
+    assert outbox['error'] == [(2, type(error).__name__, permanent)]
+
+def test_connection_error_reschedules_rest_of_batch(outbox):
+    with email_service.app.app_context():
+        email_service._deliver(BATCH, FakeSession({'b@example.com': smtplib.SMTPServerDisconnected()}))
+    assert outbox['sent'] == [1]
+    assert [e[0] for e in outbox['error']] == [2, 3]
+
+# Email yang sudah terkirim tetap ditandai 'sent' walaupun pencatatan error berikutnya gagal
+def test_sent_emails_are_marked_when_database_fails(outbox, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError('database mati')
+    monkeypatch.setattr(email_service, '_mark_error', broken)
+
+    with email_service.app.app_context(), pytest.raises(RuntimeError):
+        email_service._deliver(BATCH, FakeSession({'b@example.com': ValueError('x')}))
+    assert outbox['sent'] == [1]
+
+def test_worker_survives_errors(monkeypatch):
+    stop = threading.Event()
+    calls = []
+
+    def claim(limit):
+        calls.append(limit)
+        if len(calls) == 1:
+            raise RuntimeError('database mati')
+        stop.set()
+        return []
+    monkeypatch.setattr(email_service, '_claim_batch', claim)
+    monkeypatch.setitem(email_service.EMAIL_CONFIG, 'poll_interval', 0.01)
+
+    email_service.run_worker(stop)
+    assert len(calls) == 2
@@ -0,0 +1,45 @@
+import os
+import pytest
+
+from conftest import ROOT
+import evaluation
+
+MESSAGES = ['jam buka kantor', 'syarat buat ktp apa', 'asdf qwerty', '', 'kantor buka hari sabtu ya',
+            'cara daftar antrian online', 'terima kasih', 'ktp hilang', 'halo']
+
+
+@pytest.fixture(scope='module')
+def bundle():
+    from chatbot_engine import LEGACY_ARTIFACTS
+    if not all(os.path.exists(os.path.join(ROOT, p)) for p in LEGACY_ARTIFACTS.values()):
+        pytest.skip('artefak model belum ada')
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        evaluation._init_worker(['legacy'])
+    finally:
+        os.chdir(cwd)
+    return evaluation._bundles['legacy']
+
+
+# Intent hasil evaluasi harus sama dengan yang dicatat /get untuk pesan yang sama
+def test_classify_matches_serving_path(bundle):
+    engine = evaluation._engine
+    intents, confidence, answered = evaluation.classify(bundle, MESSAGES)
+
+    for i, message in enumerate(MESSAGES):
+        raw = engine.clean_up_sentence(message, bundle)
+        tokens = engine._corrected(raw, bundle)
+        served = engine._respond(raw, tokens, engine._classify(tokens, bundle), bundle)
+        assert intents[i] == evaluation.normalize_intent(served['intent']), message
+        assert answered[i] == (intents[i] != evaluation.NOANSWER)
+        if answered[i]:
+            assert confidence[i] == pytest.approx(served['confidence'], abs=1e-5)
+
+@pytest.mark.parametrize('logged, expected', [('none', 'noanswer'), ('noanswer', 'noanswer'), ('ktp', 'ktp')])
+def test_normalize_intent(logged, expected):
+    assert evaluation.normalize_intent(logged) == expected
+
+def test_unknown_version_is_reported_before_starting_workers():
+    with pytest.raises(evaluation.model_registry.RegistryError):
+        evaluation.evaluate(model='versi-yang-tidak-ada', workers=1)
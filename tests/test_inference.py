@@ -0,0 +1,31 @@
+import os
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from inference import NumpyModel
+
+MODEL_PATH = os.path.join(ROOT, 'model.keras')
+
+
+@pytest.fixture(scope='module')
+def models():
+    keras = pytest.importorskip('keras')
+    if not os.path.exists(MODEL_PATH):
+        pytest.skip('model.keras belum ada')
+    return keras.models.load_model(MODEL_PATH), NumpyModel.from_keras(MODEL_PATH)
+
+
+# Baris bag-of-words acak (seed tetap) ditambah satu baris tanpa kata yang dikenali
+def test_numpy_model_matches_keras(models):
+    keras_model, numpy_model = models
+    rng = np.random.default_rng(0)
+    x = (rng.random((256, numpy_model.input_dim)) < 0.1).astype(np.float32)
+    x[0] = 0
+
+    expected = keras_model.predict(x, verbose=0)
+    actual = numpy_model.predict(x.copy())
+
+    assert actual.shape == expected.shape
+    assert np.allclose(actual, expected, atol=1e-5)
+    assert np.array_equal(actual.argmax(axis=1), expected.argmax(axis=1))
@@ -0,0 +1,141 @@
+import io
+import pytest
+
+import intent_store
+
+INTENTS = [
+    {'tag': 'jam_buka', 'patterns': ['jam buka kapan', 'buka jam berapa'], 'responses': ['08.00 - 16.00']},
+    {'tag': 'ktp', 'patterns': ['syarat ktp', 'cara buat ktp, cepat?'], 'responses': ['Bawa KK', 'Isi formulir "F-1"']},
+    {'tag': 'salam', 'patterns': ['halo'], 'responses': ['Halo juga\nada yang bisa dibantu?']},
+]
+
+
+# Bentuk hasil fetch_intents: tag -> daftar baris
+def existing_rows(intents, start_id=1):
+    return {
+        intent['tag']: [dict(intent, id=start_id + i, patterns=list(intent['patterns']),
+                             responses=list(intent['responses']))]
+        for i, intent in enumerate(intents)
+    }
+
+def strip_lines(intents):
+    return [{k: v for k, v in intent.items() if k != 'line'} for intent in intents]
+
+
+@pytest.mark.parametrize('fmt', ['jsonl', 'csv'])
+def test_export_parse_round_trip(fmt):
+    text = ''.join(intent_store.export_lines(existing_rows(INTENTS), fmt))
+    parsed, errors = intent_store.parse(io.StringIO(text, newline=''), fmt)
+
+    assert errors == []
+    assert intent_store.validate(parsed) == []
+    assert strip_lines(parsed) == INTENTS
+
+
+@pytest.mark.parametrize('lines, fmt, expected_errors', [
+    (['{"tag": "a", "patterns": ["x"], "responses": ["y"]}', 'bukan json'], 'jsonl', 1),
+    (['[1, 2]'], 'jsonl', 1),
+    (['{"tag": ["a"], "patterns": ["x"], "responses": ["y"]}'], 'jsonl', 1),
+    (['{"patterns": ["x"], "responses": ["y"]}'], 'jsonl', 1),
+    (['tag,type\n', 'a,pattern\n'], 'csv', 1),
+    (['tag,type,text\n', 'a,pola,x\n'], 'csv', 1),
+])
+def test_parse_reports_malformed_lines(lines, fmt, expected_errors):
+    _, errors = intent_store.parse(lines, fmt)
+    assert len(errors) == expected_errors
+
+
+def test_duplicate_tags_are_merged():
+    merged = intent_store.merge_duplicates([
+        {'tag': 'a', 'patterns': ['p1', 'p2'], 'responses': ['r1']},
+        {'tag': 'b', 'patterns': ['q'], 'responses': ['s']},
+        {'tag': 'a', 'patterns': ['p2', 'p3'], 'responses': ['r2']},
+    ])
+    assert merged == [
+        {'tag': 'a', 'patterns': ['p1', 'p2', 'p3'], 'responses': ['r1', 'r2']},
+        {'tag': 'b', 'patterns': ['q'], 'responses': ['s']},
+    ]
+
+
+@pytest.mark.parametrize('intent, valid', [
+    ({'tag': 'a', 'patterns': ['x'], 'responses': ['y']}, True),
+    ({'tag': 'a', 'patterns': ['  x  ', '   '], 'responses': ['y']}, True),
+    ({'tag': 'a', 'patterns': ['   ', '\t'], 'responses': ['y']}, False),
+    ({'tag': 'a', 'patterns': ['x'], 'responses': []}, False),
+    ({'tag': '   ', 'patterns': ['x'], 'responses': ['y']}, False),
+    ({'tag': None, 'patterns': ['x'], 'responses': ['y']}, False),
+    ({'tag': 'a' * (intent_store.MAX_TAG_LENGTH + 1), 'patterns': ['x'], 'responses': ['y']}, False),
+    ({'tag': 'a', 'patterns': 'x', 'responses': ['y']}, False),
+    ({'tag': 'a', 'patterns': ['x', 3], 'responses': ['y']}, False),
+])
+def test_validate(intent, valid):
+    intent = dict(intent)
+    assert (intent_store.validate([intent]) == []) is valid
+
+
+def test_validate_strips_whitespace_only_items():
+    intent = {'tag': 'a', 'patterns': ['  x  ', '   '], 'responses': ['y']}
+    intent_store.validate([intent])
+    assert intent['patterns'] == ['x']
+
+
+@pytest.mark.parametrize('replace, added, changed, removed, unchanged', [
+    (False, ['baru'], ['ktp'], [], 1),
+    (True, ['baru'], ['ktp'], [3], 1),
+])
+def test_diff_classifies_intents(replace, added, changed, removed, unchanged):
+    existing = existing_rows(INTENTS)
+    incoming = [
+        dict(INTENTS[0]),                                            # tetap
+        dict(INTENTS[1], patterns=INTENTS[1]['patterns'] + ['ktp hilang']),  # berubah
+        {'tag': 'baru', 'patterns': ['x'], 'responses': ['y']},      # baru
+    ]                                                                # 'salam' (id 3) tidak ada di file
+
+    changes = intent_store.diff(existing, incoming, replace=replace)
+
+    assert [i['tag'] for i in changes['added']] == added
+    assert [i['tag'] for i in changes['changed']] == changed
+    assert changes['removed'] == removed
+    assert changes['unchanged'] == unchanged
+    assert changes['changed'][0]['id'] == 2
+    assert changes['changed'][0]['current'] is existing['ktp'][0]
+
+
+def test_diff_response_order_counts_as_change():
+    existing = existing_rows(INTENTS)
+    incoming = [dict(INTENTS[1], responses=list(reversed(INTENTS[1]['responses'])))]
+    assert [i['tag'] for i in intent_store.diff(existing, incoming)['changed']] == ['ktp']
+
+
+def test_diff_replace_removes_duplicate_rows_of_kept_tag():
+    existing = existing_rows(INTENTS)
+    existing['ktp'].append(dict(existing['ktp'][0], id=10))
+    changes = intent_store.diff(existing, [dict(i) for i in INTENTS], replace=True)
+    assert changes['removed'] == [10]
+    assert changes['unchanged'] == 3
+
+
+def test_diff_identical_replace_removes_nothing():
+    changes = intent_store.diff(existing_rows(INTENTS), [dict(i) for i in INTENTS], replace=True)
+    assert changes == {'added': [], 'changed': [], 'unchanged': 3, 'removed': []}
+
+
+@pytest.mark.parametrize('old, new, inserts, moves, deletes', [
+    (['a', 'b', 'c'], ['a', 'b', 'c'], [], [], []),
+    (['a', 'b', 'c'], ['c', 'a', 'b'], [], [(13, 0), (11, 1), (12, 2)], []),
+    (['a', 'b'], ['a', 'x', 'b'], [(7, 1, 'x')], [(12, 2)], []),
+    (['a', 'b', 'a'], ['a'], [], [], [12, 13]),
+])
+def test_child_changes(old, new, inserts, moves, deletes):
+    ids = list(range(11, 11 + len(old)))
+    got_inserts, got_moves, got_deletes = intent_store.child_changes(7, ids, old, new)
+    assert (got_inserts, got_moves, sorted(got_deletes)) == (inserts, moves, deletes)
+
+
+# Tag bukan teks dilaporkan sebagai error validasi berbaris, bukan TypeError dari merge_duplicates
+def test_import_rejects_non_string_tag_before_merging():
+    intents = [{'tag': ['a'], 'patterns': ['x'], 'responses': ['y'], 'line': 1},
+               {'tag': 'a', 'patterns': ['x'], 'responses': ['y'], 'line': 2}]
+    with pytest.raises(intent_store.IntentImportError) as e:
+        intent_store.import_intents(None, intents)
+    assert e.value.errors == ['Baris 1: tag harus berupa teks']
@@ -0,0 +1,111 @@
+import pytest
+
+from retrieval import TfidfRetriever
+
+BASE = [
+    {'id': 1, 'tag': 'ktp', 'patterns': ['syarat buat ktp', 'cara urus ktp baru'], 'responses': ['Bawa KK']},
+    {'id': 2, 'tag': 'kk', 'patterns': ['syarat kartu keluarga', 'kk hilang cara urus'], 'responses': ['Lapor RT']},
+    {'id': 3, 'tag': 'jam_buka', 'patterns': ['jam buka kantor', 'kantor buka hari apa'], 'responses': ['08.00']},
+    {'id': 4, 'tag': 'salam', 'patterns': ['halo selamat pagi'], 'responses': ['Halo']},
+]
+
+QUERIES = [
+    'syarat ktp', 'cara urus kk hilang', 'jam buka kantor', 'kantor buka hari sabtu', 'halo selamat pagi',
+    'jadwal posyandu balita', 'syarat akta kelahiran anak', 'pagi', 'urus', 'tidak ada yang cocok',
+]
+
+
+def tokens(text):
+    return text.lower().split()
+
+def rankings(retriever):
+    return {q: retriever.search(tokens(q), top=10) for q in QUERIES}
+
+# Skor harus sama (urutan term/baris di matriks boleh berbeda); tag dengan skor sama diurutkan per nama
+def assert_same_rankings(actual, expected):
+    for query in QUERIES:
+        got = sorted(actual[query], key=lambda hit: (-round(hit[1], 6), hit[0]))
+        want = sorted(expected[query], key=lambda hit: (-round(hit[1], 6), hit[0]))
+        assert [tag for tag, _ in got] == [tag for tag, _ in want], query
+        assert [score for _, score in got] == pytest.approx([score for _, score in want], abs=1e-6), query
+
+def replaced(intents, intent):
+    return [intent if i['id'] == intent['id'] else i for i in intents]
+
+
+ADDED = {'id': 5, 'tag': 'posyandu', 'patterns': ['jadwal posyandu balita', 'posyandu buka hari apa'],
+         'responses': ['Selasa']}
+EDITED = dict(BASE[1], patterns=['kk hilang', 'syarat kartu keluarga baru', 'akta kelahiran anak'],
+              responses=['Lapor ke kecamatan'])
+RENAMED = dict(BASE[2], tag='jam_layanan')
+
+CASES = {
+    'tambah': ([ADDED], [], BASE + [ADDED]),
+    'ubah': ([EDITED], [], replaced(BASE, EDITED)),
+    'hapus': ([], [4], BASE[:3]),
+    'ganti nama': ([RENAMED], [], replaced(BASE, RENAMED)),
+    'gabungan': ([EDITED, ADDED], [1], replaced(BASE, EDITED)[1:] + [ADDED]),
+}
+
+
+@pytest.mark.parametrize('changed, removed, after', CASES.values(), ids=CASES.keys())
+def test_update_matches_full_rebuild(changed, removed, after):
+    updated = TfidfRetriever.from_intents(BASE, tokens).update(changed, set(removed), tokens)
+    rebuilt = TfidfRetriever.from_intents(after, tokens)
+
+    assert len(updated) == len(rebuilt)
+    assert sorted(updated.doc_ids.tolist()) == sorted(rebuilt.doc_ids.tolist())
+    assert_same_rankings(rankings(updated), rankings(rebuilt))
+
+def test_update_replaces_legacy_rows_by_tag():
+    # data.json lama tidak menyimpan id: baris ber-id -1 dicocokkan lewat tag
+    legacy = [{k: v for k, v in intent.items() if k != 'id'} for intent in BASE]
+    updated = TfidfRetriever.from_intents(legacy, tokens).update([EDITED], set(), tokens)
+    rebuilt = TfidfRetriever.from_intents(replaced(BASE, EDITED), tokens)
+
+    assert (updated.doc_ids == -1).sum() == sum(len(i['patterns']) for i in BASE if i['tag'] != 'kk')
+    assert sorted(updated.doc_tags.tolist()) == sorted(rebuilt.doc_tags.tolist())
+    assert_same_rankings(rankings(updated), rankings(rebuilt))
+
+def test_update_keeps_the_original_index_unchanged():
+    original = TfidfRetriever.from_intents(BASE, tokens)
+    before = rankings(original)
+    original.update([EDITED, ADDED], {4}, tokens)
+    assert_same_rankings(rankings(original), before)
+
+def test_update_drops_responses_of_removed_and_renamed_intents():
+    retriever = TfidfRetriever.from_intents(BASE, tokens)
+
+    edited = retriever.update([EDITED], set(), tokens)
+    assert edited.responses == {'kk': ('Lapor ke kecamatan',)}
+
+    removed = edited.update([], {2}, tokens)
+    assert removed.responses == {}
+    assert removed.stats()['updated_intents'] == 0
+
+    renamed = retriever.update([dict(RENAMED, responses=['07.30'])], set(), tokens)
+    renamed = renamed.update([dict(RENAMED, tag='jam_kantor', responses=['07.00'])], set(), tokens)
+    assert renamed.responses == {'jam_kantor': ('07.00',)}
+
+def test_save_load_round_trip(tmp_path):
+    retriever = TfidfRetriever.from_intents(BASE, tokens).update([ADDED], set(), tokens)
+    path = tmp_path / 'retriever.npz'
+    retriever.save(path)
+    assert_same_rankings(rankings(TfidfRetriever.load(path)), rankings(retriever))
+
+def test_update_tracks_removed_and_renamed_tags():
+    retriever = TfidfRetriever.from_intents(BASE, tokens)
+
+    removed = retriever.update([], {4}, tokens)
+    assert removed.removed_tags == {'salam'}
+
+    renamed = removed.update([RENAMED], set(), tokens)
+    assert renamed.removed_tags == {'salam', 'jam_buka'}
+    assert renamed.stats()['removed_intents'] == 2
+
+    # Tag yang dipakai lagi oleh intent baru tidak lagi dianggap terhapus
+    restored = renamed.update([dict(BASE[3], id=6)], set(), tokens)
+    assert restored.removed_tags == {'jam_buka'}
+    # Tag yang masih dimiliki intent lain (tag ganda) tidak terhapus
+    duplicate = TfidfRetriever.from_intents(BASE + [dict(BASE[0], id=7)], tokens).update([], {1}, tokens)
+    assert duplicate.removed_tags == set()
@@ -1,34 +1,35 @@
-import nltk
 import json
 import pickle
 import numpy as np
-import random
 import os
-import tensorflow as tf
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords
-from keras.models import Sequential
-from keras.layers import Dense, Dropout
-from keras.optimizers import Adam
+import time
+import shutil
 from config import get_db_connection
+from vectorizer import VocabularyIndex
+import intent_store
+import preprocessing
+import model_registry
+from retrieval import TfidfRetriever, RETRIEVER_FILE
 
+EPOCHS = 200
+BATCH_SIZE = 5
+
+# Warm start dari bobot sebelumnya jika kosakata dan kelas tidak berubah
+WARM_START_EPOCHS = 60
+EARLY_STOPPING_PATIENCE = 8
+
+# Mengembalikan posisi log intent_changes saat ekspor (perubahan setelahnya disusulkan saat serving)
 def export_chatbot_data_to_json(output_file):
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT tag, patterns, responses FROM data")
-                rows = cur.fetchall()
+                change_id = intent_store.latest_change(cur)
+                existing = intent_store.fetch_intents(cur)
 
-        intents = []
-
-        for tag, patterns_str, responses_str in rows:
-            patterns = patterns_str.split('|')
-            responses = responses_str.split('|')
-            intents.append({
-                'tag': tag,
-                'patterns': patterns,
-                'responses': responses
-            })
+        intents = [
+            {'id': row['id'], 'tag': row['tag'], 'patterns': row['patterns'], 'responses': row['responses']}
+            for rows in existing.values() for row in rows
+        ]
 
         result = {
             "intents": intents
@@ -42,43 +43,86 @@ def export_chatbot_data_to_json(output_file):
 
         print(f"[✓] Data berhasil diekspor ke '{output_file}'")
         print(f"[i] Jumlah intents: {len(intents)}")
+        return change_id
 
     except Exception as e:
         print(f"[X] Gagal mengekspor data: {e}")
-
-def train_data():
-    # Download resources
-    nltk.download('punkt')
-    nltk.download('wordnet')
+        return None
+
+# Hash isi yang memengaruhi jaringan (tag + pola + preprocessing) dan yang hanya memengaruhi jawaban
+def hash_intents(intents, preprocessor=None):
+    preprocessor = preprocessor or preprocessing.default_preprocessor()
+    model_inputs = sorted((i['tag'], sorted(i['patterns'])) for i in intents['intents'])
+    responses = sorted((i['tag'], i['responses']) for i in intents['intents'])
+    architecture = {'epochs': EPOCHS, 'batch_size': BATCH_SIZE, 'layers': [128, 64],
+                    'preprocessing': preprocessor.config}
+    return (
+        model_registry.hash_json([model_inputs, architecture]),
+        model_registry.hash_json(responses),
+    )
+
+def _previous_version():
+    version = model_registry.current_version()
+    if not version:
+        return None, {}
     try:
-        nltk.download('stopwords')
-        stop_words = set(stopwords.words('english'))
-    except:
-        stop_words = set()
+        return version, model_registry.load_manifest(version).get('metadata', {})
+    except model_registry.RegistryError:
+        return None, {}
 
-    lemmatizer = WordNetLemmatizer()
-    ignore_words = {'?', '!', '.', ','}
+def train_data(progress_callback=None):
+    started = time.perf_counter()
+
+    # Semua artefak ditulis ke direktori staging lalu dipublikasikan sebagai versi baru
+    staging = model_registry.create_staging()
+    def artifact(name):
+        return os.path.join(staging, name)
 
     # Export dari database ke JSON
-    export_chatbot_data_to_json('data.json')
+    change_id = export_chatbot_data_to_json(artifact('data.json'))
 
     # Load intents dataset
-    with open('data.json', 'r', encoding='utf-8') as file:
+    with open(artifact('data.json'), 'r', encoding='utf-8') as file:
         intents = json.load(file)
 
+    # Konfigurasi preprocessing dicatat di manifest agar serving memproses teks dengan cara yang sama
+    preprocessor = preprocessing.default_preprocessor()
+    inputs_hash, responses_hash = hash_intents(intents, preprocessor)
+    previous, previous_meta = _previous_version()
+    metadata = {'inputs_hash': inputs_hash, 'responses_hash': responses_hash, 'based_on': previous,
+                'preprocessing': preprocessor.config, 'intent_change_id': change_id}
+
+    # Indeks pencarian pola untuk fallback jawaban (murah, selalu dibangun ulang)
+    retriever = TfidfRetriever.from_intents(intents['intents'], preprocessor.tokens)
+    retriever.save(artifact(RETRIEVER_FILE))
+    print(f"[i] Indeks pola: {len(retriever)} pola, {len(retriever.terms)} term")
+
+    # Pola dan tag tidak berubah: pakai ulang model versi aktif, cukup perbarui data.json
+    if previous and previous_meta.get('inputs_hash') == inputs_hash:
+        previous_dir = model_registry.version_dir(previous)
+        for name in ['model.keras', 'texts.pkl', 'labels.pkl', 'model.json', 'training_history.json']:
+            if os.path.exists(os.path.join(previous_dir, name)):
+                shutil.copy2(os.path.join(previous_dir, name), artifact(name))
+        for key in ['words', 'classes', 'documents', 'epochs', 'vocab_hash']:
+            if key in previous_meta:
+                metadata[key] = previous_meta[key]
+        return _publish(staging, metadata, 'skip', started)
+
+    # Import berat (TensorFlow/Keras) hanya saat training dijalankan
+    import tensorflow as tf
+    from keras.models import Sequential, load_model
+    from keras.layers import Dense, Dropout
+    from keras.optimizers import Adam
+    from keras.callbacks import LambdaCallback, EarlyStopping
+
     words = []
     classes = []
     documents = []
 
-    # Tokenisasi dan lemmatize
-    def preprocess_text(text):
-        tokens = nltk.word_tokenize(text)
-        return [lemmatizer.lemmatize(w.lower()) for w in tokens if w not in ignore_words and w not in stop_words]
-
     # Proses data training
     for intent in intents['intents']:
         for pattern in intent['patterns']:
-            word_list = preprocess_text(pattern)
+            word_list = preprocessor.tokens(pattern)
             words.extend(word_list)
             documents.append((word_list, intent['tag']))
             if intent['tag'] not in classes:
@@ -86,65 +130,84 @@ def train_data():
 
     words = sorted(set(words))
     classes = sorted(set(classes))
+    vocab_hash = model_registry.hash_json([words, classes])
 
     # Cek isi data
     print(f"[i] Jumlah kata unik: {len(words)}")
     print(f"[i] Jumlah kelas intent: {len(classes)}")
 
     # Simpan word & label ke pickle
-    for f in ['texts.pkl', 'labels.pkl']:
-        if os.path.exists(f):
-            os.remove(f)
-    pickle.dump(words, open('texts.pkl', 'wb'))
-    pickle.dump(classes, open('labels.pkl', 'wb'))
-
-    # Membuat data training
-    training = []
-    output_empty = [0] * len(classes)
-
-    for doc in documents:
-        bag = [1 if w in doc[0] else 0 for w in words]
-        output_row = list(output_empty)
-        output_row[classes.index(doc[1])] = 1
-        training.append([bag, output_row])
-
-    random.shuffle(training)
-    train_x = np.array([x[0] for x in training], dtype=np.float32)
-    train_y = np.array([x[1] for x in training], dtype=np.float32)
-
-    # Bangun model
-    model = Sequential([
-        Dense(128, input_shape=(len(train_x[0]),), activation='relu'),
-        Dropout(0.5),
-        Dense(64, activation='relu'),
-        Dropout(0.5),
-        Dense(len(classes), activation='softmax')
-    ])
+    with open(artifact('texts.pkl'), 'wb') as f:
+        pickle.dump(words, f)
+    with open(artifact('labels.pkl'), 'wb') as f:
+        pickle.dump(classes, f)
+
+    # Membuat data training (seluruh matriks dibangun sekali jalan)
+    vocab = VocabularyIndex(words, classes)
+    train_x = vocab.encode_batch([doc[0] for doc in documents])
+    train_y = vocab.encode_labels([doc[1] for doc in documents])
+
+    order = np.random.permutation(len(documents))
+    train_x = train_x[order]
+    train_y = train_y[order]
+
+    # Kosakata & kelas sama: lanjutkan dari bobot versi aktif dengan early stopping
+    warm_start = bool(previous) and previous_meta.get('vocab_hash') == vocab_hash
+    if warm_start:
+        model = load_model(os.path.join(model_registry.version_dir(previous), 'model.keras'))
+        epochs = WARM_START_EPOCHS
+    else:
+        # Bangun model
+        model = Sequential([
+            Dense(128, input_shape=(len(train_x[0]),), activation='relu'),
+            Dropout(0.5),
+            Dense(64, activation='relu'),
+            Dropout(0.5),
+            Dense(len(classes), activation='softmax')
+        ])
+        epochs = EPOCHS
 
     model.compile(loss='categorical_crossentropy', optimizer=Adam(learning_rate=0.001), metrics=['accuracy'])
 
     if tf.config.list_physical_devices('GPU'):
         print("[✓] GPU terdeteksi - training akan lebih cepat")
 
-    # Hapus file model lama jika ada
-    for f in ['model.keras', 'model.json', 'training_history.json']:
-        if os.path.exists(f):
-            os.remove(f)
-
-    # Latih model
-    hist = model.fit(train_x, train_y, epochs=200, batch_size=5, verbose=1)
+    # Latih model (progress per epoch dilaporkan ke job training jika ada)
+    callbacks = []
+    if warm_start:
+        callbacks.append(EarlyStopping(monitor='loss', patience=EARLY_STOPPING_PATIENCE, restore_best_weights=True))
+    if progress_callback is not None:
+        callbacks.append(LambdaCallback(on_epoch_end=lambda epoch, logs: progress_callback(epoch + 1, epochs)))
+    hist = model.fit(train_x, train_y, epochs=epochs, batch_size=BATCH_SIZE, verbose=1, callbacks=callbacks)
 
     # Simpan model modern
-    model.save('model.keras')
-    with open('training_history.json', 'w') as f:
+    model.save(artifact('model.keras'))
+    with open(artifact('training_history.json'), 'w') as f:
         json.dump(hist.history, f)
 
     # Simpan model dalam format JSON (opsional)
     model_json = model.to_json()
-    with open('model.json', 'w') as json_file:
+    with open(artifact('model.json'), 'w') as json_file:
         json_file.write(model_json)
 
-    print("[✓] Model berhasil dilatih dan disimpan!")
+    metadata.update({
+        'words': len(words),
+        'classes': len(classes),
+        'documents': len(documents),
+        'epochs': len(hist.history.get('loss', [])),
+        'vocab_hash': vocab_hash,
+    })
+    return _publish(staging, metadata, 'warm_start' if warm_start else 'full', started)
+
+# Publikasikan versi baru; server yang berjalan akan memuatnya tanpa restart
+def _publish(staging, metadata, path, started):
+    metadata['training_path'] = path
+    metadata['duration_s'] = round(time.perf_counter() - started, 2)
+    version = model_registry.publish(staging, metadata=metadata)
+
+    report = {'version': version, 'path': path, 'duration_s': metadata['duration_s']}
+    print(f"[✓] Model disimpan sebagai versi {version} (jalur: {path}, {report['duration_s']} detik)")
+    return report
 
 if __name__ == "__main__":
     train_data()
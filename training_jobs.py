@@ -0,0 +1,199 @@
+import os
+import time
+import traceback
+import multiprocessing
+from config import get_db_connection
+import intent_store
+import model_registry
+
+# Kunci advisory PostgreSQL agar hanya satu worker training yang aktif
+WORKER_LOCK_KEY = 720301
+# Jeda antar percobaan mengambil kunci worker saat worker lain masih aktif (detik)
+LOCK_RETRY_INTERVAL = float(os.getenv('TRAINING_LOCK_RETRY_INTERVAL', 30))
+
+JOB_COLUMNS = "id, status, reason, progress, epoch, total_epochs, message, requested_at, started_at, finished_at"
+
+_embedded_worker = None
+
+def _job_to_dict(row):
+    keys = [k.strip() for k in JOB_COLUMNS.split(',')]
+    return dict(zip(keys, row)) if row else None
+
+# Daftarkan retraining; edit yang masuk saat ada job antre digabung ke job tersebut.
+# start_worker=False untuk pemanggil yang menjalankan worker sendiri (CLI impor).
+def enqueue_training(reason, start_worker=True):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # Worker bisa mengambil job antre di antara INSERT dan UPDATE; ulangi sampai salah satunya berhasil
+            row = None
+            while row is None:
+                cur.execute("""
+                    INSERT INTO training_jobs (status, reason)
+                    VALUES ('queued', %s)
+                    ON CONFLICT ((status)) WHERE status = 'queued' DO NOTHING
+                    RETURNING id
+                """, (reason,))
+                row = cur.fetchone()
+                if row is None:
+                    cur.execute("""
+                        UPDATE training_jobs
+                        SET reason = LEFT(reason || '; ' || %s, 500)
+                        WHERE status = 'queued'
+                        RETURNING id
+                    """, (reason,))
+                    row = cur.fetchone()
+            conn.commit()
+
+    if start_worker and os.getenv('TRAINING_WORKER', 'embedded') == 'embedded':
+        start_embedded_worker()
+    return row[0]
+
+def get_job(job_id):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {JOB_COLUMNS} FROM training_jobs WHERE id = %s", (job_id,))
+            return _job_to_dict(cur.fetchone())
+
+def list_jobs(limit=10):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {JOB_COLUMNS} FROM training_jobs ORDER BY id DESC LIMIT %s", (limit,))
+            return [_job_to_dict(row) for row in cur.fetchall()]
+
+def _claim_next_job(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE training_jobs
+            SET status = 'running', started_at = NOW(), progress = 0
+            WHERE id = (
+                SELECT id FROM training_jobs
+                WHERE status = 'queued'
+                ORDER BY id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id
+        """)
+        row = cur.fetchone()
+        conn.commit()
+    return row[0] if row else None
+
+def _finish_job(conn, job_id, status, message):
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE training_jobs
+            SET status = %s, message = %s, finished_at = NOW(),
+                progress = CASE WHEN %s = 'done' THEN 1 ELSE progress END
+            WHERE id = %s
+        """, (status, message, status, job_id))
+        conn.commit()
+
+def _progress_reporter(conn, job_id, interval=1.0):
+    last = [0.0]
+
+    def report(epoch, total):
+        now = time.monotonic()
+        if now - last[0] < interval and epoch < total:
+            return
+        last[0] = now
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE training_jobs SET epoch = %s, total_epochs = %s, progress = %s
+                WHERE id = %s
+            """, (epoch, total, epoch / total, job_id))
+            conn.commit()
+
+    return report
+
+# Kunci dicoba tanpa menunggu; selama worker lain aktif, koneksi dikembalikan dan percobaan
+# diulang tiap LOCK_RETRY_INTERVAL detik (setiap proses web gunicorn menjalankan worker embedded
+# sendiri, tapi hanya satu yang memegang kunci dan koneksi). wait=False: None jika kunci dipegang.
+def _acquire_worker_lock(wait=True):
+    waiting = False
+    while True:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (WORKER_LOCK_KEY,))
+            acquired = cur.fetchone()[0]
+        conn.commit()
+        if acquired:
+            return conn
+        conn.close()
+        if not wait:
+            return None
+        if not waiting:
+            print("[i] Worker training lain sedang aktif, menunggu giliran")
+            waiting = True
+        time.sleep(LOCK_RETRY_INTERVAL)
+
+# Loop worker: ambil job antre satu per satu dan jalankan train_data()
+# Mengembalikan False tanpa menjalankan apa pun jika wait_for_lock=False dan worker lain aktif.
+def run_worker(poll_interval=2.0, once=False, wait_for_lock=True):
+    from training import train_data
+
+    lock_conn = _acquire_worker_lock(wait_for_lock)
+    if lock_conn is None:
+        return False
+    with lock_conn.cursor() as cur:
+        # Job 'running' milik worker sebelumnya yang berhenti di tengah jalan
+        cur.execute("""
+            UPDATE training_jobs
+            SET status = 'failed', message = 'Worker berhenti sebelum training selesai', finished_at = NOW()
+            WHERE status = 'running'
+        """)
+        lock_conn.commit()
+
+    print("[i] Worker training aktif")
+    conn = get_db_connection()
+    try:
+        while True:
+            job_id = _claim_next_job(conn)
+            if job_id is None:
+                if once:
+                    return True
+                time.sleep(poll_interval)
+                continue
+
+            print(f"[i] Menjalankan job training #{job_id}")
+            try:
+                report = train_data(progress_callback=_progress_reporter(conn, job_id))
+                message = f"Versi {report['version']} (jalur {report['path']}, {report['duration_s']} detik)"
+                _finish_job(conn, job_id, 'done', message)
+                print(f"[✓] Job training #{job_id} selesai: {message}")
+                _prune_change_log(conn)
+            except Exception as e:
+                conn.rollback()
+                _finish_job(conn, job_id, 'failed', traceback.format_exc()[-2000:])
+                print(f"[X] Job training #{job_id} gagal: {e}")
+    finally:
+        conn.close()
+        lock_conn.close()
+
+# Log dibersihkan hanya sampai posisi versi model tertua yang masih disimpan, agar rollback
+# ke versi itu tetap bisa memperbarui indeks pola dari log
+def _prune_change_log(conn):
+    up_to = model_registry.oldest_change_id()
+    if up_to is None:
+        return
+    try:
+        with conn.cursor() as cur:
+            removed = intent_store.prune_changes(cur, up_to)
+        conn.commit()
+        if removed:
+            print(f"[i] {removed} entri log perubahan intent lama dihapus")
+    except Exception as e:
+        conn.rollback()
+        print(f"[!] Gagal membersihkan log perubahan intent: {e}")
+
+# Worker di proses terpisah (spawn) agar TensorFlow tidak dimuat di proses web
+def start_embedded_worker():
+    global _embedded_worker
+    if _embedded_worker is not None and _embedded_worker.is_alive():
+        return
+    ctx = multiprocessing.get_context('spawn')
+    _embedded_worker = ctx.Process(target=run_worker, name='training-worker', daemon=True)
+    _embedded_worker.start()
+
+
+if __name__ == "__main__":
+    run_worker()
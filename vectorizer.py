@@ -0,0 +1,53 @@
+import numpy as np
+
+
+class VocabularyIndex:
+    """Indeks kosakata (kata -> kolom) dan label (tag -> id) untuk bag-of-words."""
+
+    def __init__(self, words, classes=()):
+        self.words = list(words)
+        self.classes = list(classes)
+        self.word_index = {w: i for i, w in enumerate(self.words)}
+        self.class_index = {c: i for i, c in enumerate(self.classes)}
+
+    def __len__(self):
+        return len(self.words)
+
+    # Kolom yang aktif untuk sebuah daftar token (representasi sparse)
+    def indices(self, tokens):
+        index = self.word_index
+        return sorted({index[t] for t in tokens if t in index})
+
+    # Vektor bag-of-words dense; `out` bisa diisi buffer yang sudah dialokasikan
+    def encode(self, tokens, out=None):
+        if out is None:
+            out = np.zeros(len(self.words), dtype=np.float32)
+        else:
+            out.fill(0)
+        cols = self.indices(tokens)
+        if cols:
+            out[cols] = 1
+        return out
+
+    # Matriks bag-of-words untuk banyak dokumen sekaligus dalam satu kali isi
+    def encode_batch(self, token_lists):
+        index = self.word_index
+        rows, cols = [], []
+        for row, tokens in enumerate(token_lists):
+            for t in tokens:
+                col = index.get(t)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+
+        matrix = np.zeros((len(token_lists), len(self.words)), dtype=np.float32)
+        if rows:
+            matrix[rows, cols] = 1
+        return matrix
+
+    # One-hot label untuk banyak dokumen sekaligus
+    def encode_labels(self, labels):
+        ids = np.fromiter((self.class_index[label] for label in labels), dtype=np.intp, count=len(labels))
+        matrix = np.zeros((len(ids), len(self.classes)), dtype=np.float32)
+        matrix[np.arange(len(ids)), ids] = 1
+        return matrix